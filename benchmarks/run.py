@@ -0,0 +1,200 @@
+"""run.py throughput benchmark of every algorithm on every built-in function
+
+usage, from the repository root:
+    python -m benchmarks.run --dims 10 30 --pops 20 40 --generations 200 --output bench.json
+
+every result reports the wall time per generation, evaluations per second,
+the split of the wall time between objective evaluation and swarm update,
+and the peak traced memory of a second, identical run under tracemalloc
+"""
+import pso
+import functions
+from functions.problem import Problem
+from argparse import ArgumentParser
+from inspect import signature
+from time import perf_counter
+import numpy as np
+import datetime
+import json
+import platform
+import sys
+import tracemalloc
+
+# search domain of every benchmark function
+domains:dict[str, tuple[float, float]] = {
+    "Sphere": (-100, 100),
+    "SumSquare": (-10, 10),
+    "Schaffer": (-100, 100),
+    "Ackley": (-32.768, 32.768),
+    "Rastrigin": (-5.12, 5.12),
+    "Griewand": (-600, 600),
+    "Rosenbrock": (-5, 10),
+    "Zakharov": (-5, 10),
+    "Easom": (-100, 100),
+    "Step": (-100, 100),
+    "QuarticWithNoise": (-1.28, 1.28)
+}
+# functions only defined in 2-D
+twoDimensional = {"Schaffer", "Easom"}
+# evaluations happen in worker processes and cannot be timed from here
+skipByDefault = {"IslandDMSPSO"}
+
+class _Timer:
+    """
+    accumulated evaluation time and count of a timed problem, nested calls
+    (evaluateBatch falling back to evaluate) are only counted once
+    """
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.evaluations = 0
+        self.depth = 0
+
+def timedProblem(problem:Problem) -> tuple[Problem, _Timer]:
+    """
+    return a copy of problem whose evaluate/evaluateBatch are timed
+    """
+    base = type(problem)
+    timer = _Timer()
+
+    def evaluate(self, solution):
+        timer.depth += 1
+        start = perf_counter()
+        try:
+            return base.evaluate(self, solution)
+        finally:
+            timer.depth -= 1
+            if timer.depth == 0:
+                timer.seconds += perf_counter() - start
+                timer.evaluations += 1
+
+    def evaluateBatch(self, solutions):
+        timer.depth += 1
+        start = perf_counter()
+        try:
+            return base.evaluateBatch(self, solutions)
+        finally:
+            timer.depth -= 1
+            if timer.depth == 0:
+                timer.seconds += perf_counter() - start
+                timer.evaluations += len(solutions)
+
+    cls = type("Timed" + base.__name__, (base,), {"evaluate": evaluate, "evaluateBatch": evaluateBatch})
+    timed = cls.__new__(cls)
+    timed.__dict__.update(problem.__dict__)
+    return timed, timer
+
+def populationArgs(alg:type, N:int) -> dict:
+    """
+    constructor arguments giving alg a population of about N particles
+    """
+    params = signature(alg).parameters
+    if "populationSize" in params:
+        return {"populationSize": N}
+    if "row" in params and "col" in params:
+        # the most square grid with row * col = N
+        col = max(c for c in range(1, int(N ** 0.5) + 1) if N % c == 0)
+        return {"row": N // col, "col": col}
+    if "subSwarmSize" in params:
+        size = params["subSwarmSize"].default
+        return {"subSwarmNumber": max(1, N // size)}
+    raise ValueError(f"cannot set the population size of {alg.__name__}")
+
+def benchmark(
+        algName:str,
+        funcName:str,
+        D:int,
+        N:int,
+        generations:int,
+        seed:int,
+        memory:bool
+    ) -> dict:
+    alg = getattr(pso, algName)
+    lo, hi = domains[funcName]
+    problem = getattr(functions, funcName)([lo] * D, [hi] * D)
+    kwargs = dict(populationArgs(alg, N), maxGeneration=generations, seed=seed)
+
+    timed, timer = timedProblem(problem)
+    start = perf_counter()
+    instance = alg(timed, **kwargs)
+    fbest, _ = instance.run()
+    seconds = perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        alg(problem, **kwargs).run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "algorithm": algName,
+        "function": funcName,
+        "D": D,
+        "N": len(instance.swarm) if hasattr(instance, "swarm") else N,
+        "generations": generations,
+        "seconds": seconds,
+        "secondsPerGeneration": seconds / generations,
+        "evaluations": timer.evaluations,
+        "evaluationsPerSecond": timer.evaluations / seconds if seconds > 0 else None,
+        "evaluationSeconds": timer.seconds,
+        "updateSeconds": seconds - timer.seconds,
+        "peakMemoryBytes": peak,
+        "fbest": float(fbest)
+    }
+
+def main(argv:list[str] = None) -> dict:
+    parser = ArgumentParser(description="benchmark every algorithm on every built-in function")
+    parser.add_argument("--algorithms", nargs="+", default=[a for a in pso.__all__ if a not in skipByDefault])
+    parser.add_argument("--functions", nargs="+", default=list(functions.__all__))
+    parser.add_argument("--dims", nargs="+", type=int, default=[10, 30])
+    parser.add_argument("--pops", nargs="+", type=int, default=[20, 40])
+    parser.add_argument("--generations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc run")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if omitted")
+    args = parser.parse_args(argv)
+
+    results = []
+    for algName in args.algorithms:
+        for funcName in args.functions:
+            dims = [2] if funcName in twoDimensional else args.dims
+            for D in dims:
+                for N in args.pops:
+                    try:
+                        res = benchmark(algName, funcName, D, N, args.generations, args.seed, args.memory)
+                    except Exception as exc:
+                        # record the failing case and go on with the rest of the matrix
+                        res = {"algorithm": algName, "function": funcName, "D": D, "N": N, "error": repr(exc)}
+                        results.append(res)
+                        print(f"{algName:20s} {funcName:18s} D={D:<5d} N={N:<5d} error: {exc!r}", file=sys.stderr)
+                        continue
+                    results.append(res)
+                    rate = res["evaluationsPerSecond"] or 0.0
+                    print(
+                        f"{algName:20s} {funcName:18s} D={D:<5d} N={res['N']:<5d} "
+                        f"{res['secondsPerGeneration'] * 1e3:9.3f} ms/gen "
+                        f"{rate:12.0f} evals/s",
+                        file=sys.stderr
+                    )
+
+    report = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "arguments": vars(args)
+        },
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 """
 from .problem import Problem
 from math import pi, exp, sqrt, cos
+import numpy as np
 
 class Ackley(Problem):
     def evaluate(self, solution:list[float]) -> float:
@@ -14,4 +15,14 @@ class Ackley(Problem):
         for x in solution:
             alpha += (x ** 2)
             beta += cos(c * x)
-        return - a * exp(-b * sqrt(alpha / d)) - exp(beta / d) + a + exp(1)
\ No newline at end of file
+        return - a * exp(-b * sqrt(alpha / d)) - exp(beta / d) + a + exp(1)
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        a = 20
+        b = 0.2
+        c = 2 * pi
+        d = self.D
+        X = np.asarray(solutions, dtype=float)
+        alpha = np.sum(X ** 2, axis=1)
+        beta = np.sum(np.cos(c * X), axis=1)
+        return - a * np.exp(-b * np.sqrt(alpha / d)) - np.exp(beta / d) + a + exp(1)
\ No newline at end of file
@@ -2,9 +2,16 @@
 """
 from .problem import Problem
 from math import cos, exp, pi
+import numpy as np
 
 class Easom(Problem):
     def evaluate(self, solution:list[float]) -> float:
         x1 = solution[0]
         x2 = solution[1]
-        return -cos(x1) * cos(x2) * exp(-((x1 - pi) ** 2) - ((x2 - pi) ** 2))
\ No newline at end of file
+        return -cos(x1) * cos(x2) * exp(-((x1 - pi) ** 2) - ((x2 - pi) ** 2))
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        x1 = X[:, 0]
+        x2 = X[:, 1]
+        return -np.cos(x1) * np.cos(x2) * np.exp(-((x1 - pi) ** 2) - ((x2 - pi) ** 2))
\ No newline at end of file
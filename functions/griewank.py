@@ -2,6 +2,7 @@
 """
 from .problem import Problem
 from math import sqrt, cos
+import numpy as np
 
 class Griewand(Problem):
     def evaluate(self, x:list[float]) -> float:
@@ -9,5 +10,11 @@ class Griewand(Problem):
         totalProduct = 1.0
         for i in range(self.D):
             totalSum += ((x[i] ** 2) / 4000)
-            totalProduct *= cos(x[i] / sqrt(i))
+            totalProduct *= cos(x[i] / sqrt(i + 1))
         return totalSum - totalProduct + 1
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        totalSum = np.sum(X ** 2 / 4000, axis=1)
+        totalProduct = np.prod(np.cos(X / np.sqrt(np.arange(1, self.D + 1))), axis=1)
+        return totalSum - totalProduct + 1
\ No newline at end of file
@@ -2,6 +2,7 @@
 """
 from abc import ABC, abstractmethod
 from typing import List
+import numpy as np
 
 class Problem(ABC):
     def __init__(self, lb:List[float], ub:List[float], minimize:bool = True) -> None:
@@ -24,4 +25,11 @@ class Problem(ABC):
         """
         object function
         """
-        pass
\ No newline at end of file
+        pass
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        """
+        object function for a (N, D) matrix of solutions, return the (N,) fitness values
+        default evaluates the rows one by one, override it for vectorized or parallel objectives
+        """
+        return np.array([self.evaluate(x) for x in solutions], dtype=float)
\ No newline at end of file
@@ -2,10 +2,15 @@
 """
 from .problem import Problem
 from random import random as rand
+import numpy as np
 
 class QuarticWithNoise(Problem):
     def evaluate(self, solution:list[float]) -> float:
         res = 0.0
         for i in range(self.D):
             res += i * (solution[i] ** 4)
-        return res + rand()
\ No newline at end of file
+        return res + rand()
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        return (X ** 4) @ np.arange(self.D, dtype=float) + np.random.random(len(X))
\ No newline at end of file
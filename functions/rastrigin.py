@@ -2,10 +2,15 @@
 """
 from .problem import Problem
 from math import cos, pi
+import numpy as np
 
 class Rastrigin(Problem):
     def evaluate(self, solution: list[float]) -> float:
         res = 0.0
         for x in solution:
             res += ((x ** 2) - 10 * cos(2 * pi * x))
-        return 10 * self.D + res
\ No newline at end of file
+        return 10 * self.D + res
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        return 10 * self.D + np.sum(X ** 2 - 10 * np.cos(2 * pi * X), axis=1)
\ No newline at end of file
@@ -1,10 +1,16 @@
 """rosenbrock Rosenbrock function
 """
 from .problem import Problem
+import numpy as np
 
 class Rosenbrock(Problem):
     def evaluate(self, x:list[float]) -> float:
         res = 0.0
         for i in range(self.D - 1):
             res += (100 * (x[i+1] - x[i] ** 2) ** 2 + (x[i] - 1) ** 2)
-        return res
\ No newline at end of file
+        return res
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        head = X[:, :-1]
+        return np.sum(100 * (X[:, 1:] - head ** 2) ** 2 + (head - 1) ** 2, axis=1)
\ No newline at end of file
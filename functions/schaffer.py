@@ -3,9 +3,15 @@
 
 from .problem import Problem
 from math import sqrt, sin
+import numpy as np
 
 class Schaffer(Problem):
     def evaluate(self, solution: list[float]) -> float:
         x = solution[0]
         y = solution[1]
-        return 0.5 + ((sin(sqrt(x**2 + y**2)))**2 - 0.5) / ((1 + 0.001*(x**2 + y**2)) ** 2)
\ No newline at end of file
+        return 0.5 + ((sin(sqrt(x**2 + y**2)))**2 - 0.5) / ((1 + 0.001*(x**2 + y**2)) ** 2)
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        r2 = X[:, 0] ** 2 + X[:, 1] ** 2
+        return 0.5 + (np.sin(np.sqrt(r2)) ** 2 - 0.5) / ((1 + 0.001 * r2) ** 2)
\ No newline at end of file
@@ -3,10 +3,15 @@
 
 from .problem import Problem
 from typing import List
+import numpy as np
 
 class Sphere(Problem):
     def evaluate(self, solution: list[float]) -> float:
         res = 0
         for i in range(self.D):
             res += solution[i] ** 2
-        return res
\ No newline at end of file
+        return res
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        return np.sum(X ** 2, axis=1)
\ No newline at end of file
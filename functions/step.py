@@ -2,10 +2,15 @@
 """
 from .problem import Problem
 from math import floor
+import numpy as np
 
 class Step(Problem):
     def evaluate(self, solution:list[float]) -> float:
         res = 0.0
         for x in solution:
             res += (floor(x + 0.5)) ** 2
-        return res
\ No newline at end of file
+        return res
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        return np.sum(np.floor(X + 0.5) ** 2, axis=1)
\ No newline at end of file
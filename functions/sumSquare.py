@@ -1,10 +1,15 @@
 """sumSquare.py Sum Square function
 """
 from .problem import Problem
+import numpy as np
 
 class SumSquare(Problem):
     def evaluate(self, x:list[float]) -> float:
         res = 0.0
         for i in range(self.D):
             res += i * (x[i] ** 2)
-        return res
\ No newline at end of file
+        return res
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        return (X ** 2) @ np.arange(self.D, dtype=float)
\ No newline at end of file
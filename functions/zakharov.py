@@ -1,6 +1,7 @@
 """zakharov.py Zakharov function
 """
 from .problem import Problem
+import numpy as np
 
 class Zakharov(Problem):
     def evaluate(self, x:list[float]) -> float:
@@ -11,4 +12,11 @@ class Zakharov(Problem):
             sum1 += x[i] ** 2
             sum2 += 0.5 * i * x[i]
             sum3 += 0.5 * i * x[i]
+        return sum1 + (sum2 ** 2) + (sum3 ** 4)
+
+    def evaluateBatch(self, solutions:np.ndarray) -> np.ndarray:
+        X = np.asarray(solutions, dtype=float)
+        sum1 = np.sum(X ** 2, axis=1)
+        sum2 = X @ (0.5 * np.arange(self.D, dtype=float))
+        sum3 = sum2
         return sum1 + (sum2 ** 2) + (sum3 ** 4)
\ No newline at end of file
@@ -1,19 +1,25 @@
 """ALCPSO.py Aging Leader and Challengers Particle Swarm Optimization
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
 from functions.problem import Problem
-from random import uniform as rand
-from random import randrange as randrange
+import numpy as np
+from typing import Iterator
 
 class Leader:
     def __init__(self, D:int) -> None:
-        self.x = [0.0 for _ in range(D)]
+        self.x = np.zeros(D)
         self.fx:float = None
         self.lifeSpan:int = None
         self.age:int = None
     
     def setCurrentPositionAsLeader(self, p:CanonicalParticle) -> None:
-        self.x = [x for x in p.x]
+        self.x = np.array(p.x, dtype=float)
         self.fx = p.fx
 
 class LifeSpanController:
@@ -37,9 +43,15 @@ class LifeSpanController:
                 if not self.improveLeader:
                     l.lifeSpan -= 1
 
-class ALCPSO:
+class ALCPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self.lsc.reset()
             self._updateSwarm()
             self.lsc.adjuctLifeSpan(self.leader)
@@ -47,8 +59,8 @@ class ALCPSO:
             if self.leader.age >= self.leader.lifeSpan:
                 self._challenging()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -61,10 +73,15 @@ class ALCPSO:
             initialLifeSpan:int = 60,
             challengeTmax:int = 2,
             vmaxPercent:float = 0.5,
-            initialSwarm:list[CanonicalParticle] = None
+            initialSwarm:list[CanonicalParticle] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
         
-        self.f = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -82,14 +99,16 @@ class ALCPSO:
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         # find gBest
         self.gBestIndex:int = 0
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
         
         # set leader
@@ -101,28 +120,33 @@ class ALCPSO:
         self.lsc = LifeSpanController()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = CanonicalParticle(self.dim)
-            for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            self.swarm.x[i] = [self.rng.uniform(self.lb[d], self.ub[d]) for d in range(self.dim)]
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateSwarm(self) -> None:
+        s = self.swarm
+        leader = self.leader.x.tolist()
         for i in range(self.popSize):
-            p =self.swarm[i]
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
             for d in range(self.dim):
                 # update velocity
-                p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (self.leader.x[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (leader[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest leader
-            p.fx = self.f(p.x)
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest leader
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        for i in range(self.popSize):
+            p = self.swarm[i]
             if(self.fitter(p.fx, self.leader.fx)):
                 self.leader.setCurrentPositionAsLeader(p)
                 self.lsc.improveLeader = True
@@ -136,25 +160,33 @@ class ALCPSO:
 
     def _challenging(self) -> None:
         # record the current status
-        positions = [[i for i in p.x] for p in self.swarm]
-        velocities = [[i for i in p.v] for p in self.swarm]
-        fvals = [p.fx for p in self.swarm]        
+        positions = self.swarm.x.copy()
+        velocities = self.swarm.v.copy()
+        fvals = self.swarm.fx.copy()
         # evaluate the challenger
         challenger = self._generateChallenger()
+        s = self.swarm
         for t in  range(self.T):
             improvePbest = False
+            # the challenger moves whenever a particle beats it
+            guide = challenger.x.tolist()
             for i in range(self.popSize):
-                p = self.swarm[i]
+                # the loop works on lists, the rows are written back once
+                x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
                 for d in range(self.dim):
                     # update velocity
-                    p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                                + self.c2 * rand(0,1) * (challenger.x[d] - p.x[d])
-                    p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                    v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                                + self.c2 * self.rng.uniform(0,1) * (guide[d] - x[d])
+                    v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                     # update position
-                    p.x[d] = p.x[d] + p.v[d]
-                    p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-                # evaluate fitness and update pbest challenger
-                p.fx = self.f(p.x)
+                    x[d] = x[d] + v[d]
+                    x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+                s.x[i] = x
+                s.v[i] = v
+            # evaluate fitness and update pbest challenger
+            self.swarm.fx[:] = self.fBatch(self.swarm.x)
+            for i in range(self.popSize):
+                p = self.swarm[i]
                 if(self.fitter(p.fx, challenger.fx)):
                     challenger.setCurrentPositionAsLeader(p)
                 if(self.fitter(p.fx, p.fpbest)):
@@ -170,11 +202,9 @@ class ALCPSO:
                 return
 
         # reject challenger and roll back
-        for i in range(self.popSize):
-            p = self.swarm[i]
-            p.x = [t for t in positions[i]]
-            p.v = [t for t in velocities[i]]
-            p.fx = fvals[i]
+        self.swarm.x[:] = positions
+        self.swarm.v[:] = velocities
+        self.swarm.fx[:] = fvals
         self.leader.age = self.leader.lifeSpan - 1
 
     def _generateChallenger(self) -> Leader:
@@ -182,14 +212,14 @@ class ALCPSO:
         challenger = Leader(self.dim)
         count = 0
         for d in range(self.dim):
-            if rand(0,1) < self.pro:
-                challenger.x[d] = rand(self.lb[d], self.ub[d])
+            if self.rng.uniform(0,1) < self.pro:
+                challenger.x[d] = self.rng.uniform(self.lb[d], self.ub[d])
                 count += 1
             else:
                 challenger.x[d] = self.leader.x[d]
         if count == 0:
-            mutatedim = randrange(0, self.dim)
-            challenger.x[mutatedim] = rand(self.lb[d], self.ub[d])
+            mutatedim = self.rng.randrange(0, self.dim)
+            challenger.x[mutatedim] = self.rng.uniform(self.lb[d], self.ub[d])
         challenger.fx = self.f(challenger.x)
         challenger.age = 0
         challenger.lifeSpan = self.initialLifeSpan
@@ -1,25 +1,44 @@
 """APSO.py Adaptive PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .askTell import AskTell, generationEnd
 from functions.problem import Problem
-from random import uniform as rand, gauss, randrange
-from math import sqrt, exp
+from math import exp
+import numpy as np
 
 # states constant
 _EXPLORATION:int = 0
 _EXPLOITATION:int = 1
 _CONVERGENCE:int = 2
 _JUMPINGOUT:int = 3
+# breakpoints of the fuzzy membership functions, indexed by state
+_MEMBERSHIP:tuple[tuple[tuple[float, ...], tuple[float, ...]], ...] = (
+    ((0.0, 0.4, 0.6, 0.7, 0.8, 1.0), (0.0, 0.0, 1.0, 1.0, 0.0, 0.0)),
+    ((0.0, 0.2, 0.3, 0.4, 0.6, 1.0), (0.0, 0.0, 1.0, 1.0, 0.0, 0.0)),
+    ((0.0, 0.1, 0.3, 1.0), (1.0, 1.0, 0.0, 0.0)),
+    ((0.0, 0.7, 0.9, 1.0), (0.0, 0.0, 1.0, 1.0))
+)
+# elements of the pairwise differences computed at once by _meanDistances
+_distanceBlockSize:int = 1 << 20
 
-class APSO:
+class APSO(AskTell, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        self._drive()
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def _evolve(self):
+        while self._running():
             self._ESE()
-            self._updateParameters()
-            self._updateSwarm()
+            yield from self._updateParameters()
+            yield from self._updateSwarm()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield generationEnd
 
     def __init__(
             self,
@@ -33,11 +52,24 @@ class APSO:
             elrmin:float = 0.1,
             elrmax:float = 1.0,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[CanonicalParticle] = None
+            initialSwarm:list[CanonicalParticle] | SwarmState = None,
+            backend:str = "python",
+            eseDistance:str = "exact",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
-        
-        self.fecounter:int = 0
-        self.evaluate = objectFunction.evaluate
+
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+        if eseDistance not in ("exact", "centroid"):
+            raise ValueError(f"unknown eseDistance: {eseDistance}")
+        self.eseDistance = eseDistance
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -58,63 +90,92 @@ class APSO:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = CanonicalParticle(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
-    def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+    def _updateSwarm(self):
+        if self.backend == "numpy":
+            yield from self._updateSwarmNumpy()
+            return
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
             for d in range(self.dim):
                 # update velocity
-                p.v[d] = self.w * self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (gBest.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = self.w * self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (gBest[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if self.fitter(p.fx, p.fpbest):
-                p.updatePbest()
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        s.fx[:] = yield s.x
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
+
+    def _updateSwarmNumpy(self):
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex]
+        r1 = self.rng.generator.uniform(0, 1, s.x.shape)
+        r2 = self.rng.generator.uniform(0, 1, s.x.shape)
+        # update velocity, same rule as the python loop
+        s.v[:] = self.w * self.c1 * r1 * (s.pbest - s.x) + self.c2 * r2 * (gBest - s.x)
+        np.clip(s.v, -self.vmaxArray, self.vmaxArray, out=s.v)
+        # update position
+        s.x += s.v
+        np.clip(s.x, self.lbArray, self.ubArray, out=s.x)
+        # evaluate fitness and update pbest
+        s.fx[:] = yield s.x
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
     def _ESE(self) -> None:
         # calculate mean distance
-        dis = [self._calculateMeanDis(i) for i in range(self.popSize)]
+        dis = self._meanDistances()
         # calculate evolutionary factor
-        dmax = max(dis)
-        dmin = min(dis)
-        dg = dis[self.gBestIndex]
+        dmax = float(dis.max())
+        dmin = float(dis.min())
+        dg = float(dis[self.gBestIndex])
         self.efactor = (dg - dmin) / (dmax - dmin)
         self._identifyEvolutionState()
 
-    def _updateParameters(self) -> None:
+    def _updateParameters(self):
         # update c1 c2
-        d1 = rand(0.05, 0.1)
-        d2 = rand(0.05, 0.1)
-        r1 = rand(0, d1)
-        r2 = rand(0, d2)
+        d1 = self.rng.uniform(0.05, 0.1)
+        d2 = self.rng.uniform(0.05, 0.1)
+        r1 = self.rng.uniform(0, d1)
+        r2 = self.rng.uniform(0, d2)
         if self.state == _EXPLORATION:
             self.c1 = self.c1 + r1
             self.c2 = self.c2 - r2
@@ -124,7 +185,7 @@ class APSO:
         elif self.state == _CONVERGENCE:
             self.c1 = self.c1 + 0.5 * r1
             self.c2 = self.c2 + 0.5 * r2
-            self._ELS()
+            yield from self._ELS()
         elif self.state == _JUMPINGOUT:
             self.c1 = self.c1 - r1
             self.c2 = self.c2 + r2
@@ -138,15 +199,16 @@ class APSO:
         self.w = 1 / (1 + 1.5 * exp(-2.6 * self.efactor))
         self.w = max(self.wmin, max(self.w, self.wmax))
     
-    def _ELS(self) -> None:
+    def _ELS(self):
         gbest = self.swarm[self.gBestIndex]
-        mutate = randrange(0, self.dim)
-        position = [x for x in gbest.pbest]
+        mutate = self.rng.randrange(0, self.dim)
+        position = gbest.pbest.tolist()
         elr = self.elrmax - (self.elrmax - self.elrmin) * (self.g / self.G)
-        n = gauss(mu = 0, sigma = elr)
+        n = self.rng.gauss(mu = 0, sigma = elr)
         position[mutate] = gbest.pbest[mutate] + (self.ub[mutate] - self.lb[mutate]) * n
         position[mutate] = max(self.lb[mutate], min(position[mutate], self.ub[mutate]))
-        fp = self.f(position)
+        # elitist learning is one extra evaluation
+        fp = (yield np.array([position]))[0]
         if self.fitter(fp, gbest.fpbest):
             gbest.pbest =  position
             gbest.fpbest = fp
@@ -161,87 +223,48 @@ class APSO:
                 gworst.fx = fp
                 gworst.updatePbest()
 
-    def _calculateMeanDis(self, idx:int) -> float:
-        meandis = 0.0
-        p = self.swarm[idx]
-        for i in range(self.popSize):
-            dis = 0.0
-            th =self.swarm[i]
-            for d in range(self.dim):
-                dis += (p.x[d] - th.x[d]) ** 2
-            meandis += sqrt(dis)
-        return meandis / (self.popSize - 1)
+    def _meanDistances(self) -> np.ndarray:
+        """
+        mean euclidean distance of every particle to the others, computed
+        exactly on blocks of rows so the (block, N, D) differences stay
+        around _distanceBlockSize elements, or in O(N*D) from the centroid
+        with eseDistance = "centroid"
+        """
+        x = self.swarm.x
+        n = len(x)
+        if self.eseDistance == "centroid":
+            # mean squared distance to the others is |x_i - c|^2 + mean |x_j - c|^2
+            # up to the factor n / (n - 1), its root stands in for the mean distance
+            sq = np.square(x - x.mean(axis=0)).sum(axis=1)
+            return np.sqrt(sq + sq.mean())
+        dis = np.empty(n)
+        rows = max(1, _distanceBlockSize // max(1, n * x.shape[1]))
+        for start in range(0, n, rows):
+            diff = x[start:start + rows, None, :] - x[None, :, :]
+            dis[start:start + rows] = np.sqrt(np.square(diff).sum(axis=2)).sum(axis=1)
+        return dis / (n - 1)
 
     def _identifyEvolutionState(self) -> None:
-        # compute membership function
-        us = [0.0 for _ in range(4)]
-        # Exploration
-        if 0 <= self.efactor <= 0.4:
-            us[_EXPLORATION] = 0.0
-        elif 0.4 < self.efactor <= 0.6:
-            us[_EXPLORATION] = 5 * self.efactor - 2
-        elif 0.6 < self.efactor <= 0.7:
-            us[_EXPLORATION] = 1.0
-        elif 0.7 < self.efactor <= 0.8:
-            us[_EXPLORATION] = -10 * self.efactor + 8
-        elif 0.8 < self.efactor <= 1.0:
-            us[_EXPLORATION] = 0.0
-        # Exploitation
-        if 0 <= self.efactor <= 0.2:
-            us[_EXPLOITATION] = 0.0
-        elif 0.2 < self.efactor <= 0.3:
-            us[_EXPLOITATION] = 10 * self.efactor - 2
-        elif 0.3 < self.efactor <= 0.4:
-            us[_EXPLOITATION] = 1.0
-        elif 0.4 < self.efactor <= 0.6:
-            us[_EXPLOITATION] = -5 * self.efactor + 3
-        elif 0.6 < self.efactor <= 1.0:
-            us[_EXPLOITATION] = 0.0
-        # Convergence
-        if 0 <= self.efactor <= 0.1:
-            us[_CONVERGENCE] = 1.0
-        elif 0.1 < self.efactor <= 0.3:
-            us[_CONVERGENCE] = -5 * self.efactor + 1.5
-        elif 0.3 < self.efactor <= 1.0:
-            us[_CONVERGENCE] = 0.0
-        # Jumping Out
-        if 0 <= self.efactor <= 0.7:
-            us[_JUMPINGOUT] = 0.0
-        elif 0.7 < self.efactor <= 0.9:
-            us[_JUMPINGOUT] = 5 * self.efactor - 3.5
-        elif 0.9 < self.efactor <= 1:
-            us[_JUMPINGOUT] = 1.0
+        # compute membership function, piecewise linear in efactor
+        us = np.array([np.interp(self.efactor, xs, ys) for xs, ys in _MEMBERSHIP])
+        active = us != 0.0
         # classify the state
-        zeroCnt = 0
-        for u in us:
-            if u == 0.0:
-                zeroCnt += 1
+        zeroCnt = 4 - int(np.count_nonzero(active))
         if zeroCnt == 3:
-            if us[_EXPLORATION] != 0.0:
-                self.state = _EXPLORATION
-            elif us[_EXPLOITATION] != 0.0:
-                self.state = _EXPLOITATION
-            elif us[_CONVERGENCE] != 0.0:
-                self.state = _CONVERGENCE
-            elif us[_JUMPINGOUT] != 0.0:
-                self.state = _JUMPINGOUT
+            self.state = int(np.flatnonzero(active)[0])
         elif zeroCnt == 2:
-            if us[_CONVERGENCE] != 0.0 and us[_EXPLOITATION] != 0.0:
+            if active[_CONVERGENCE] and active[_EXPLOITATION]:
                 if self.state == _EXPLORATION or self.state == _EXPLOITATION:
                     self.state = _EXPLOITATION
                 else:
                     self.state = _CONVERGENCE
-            if us[_EXPLOITATION] != 0.0 and us[_EXPLORATION] != 0.0:
+            if active[_EXPLOITATION] and active[_EXPLORATION]:
                 if self.state == _EXPLORATION or self.state == _JUMPINGOUT:
                     self.state = _EXPLORATION
                 else:
                     self.state = _EXPLOITATION
-            if us[_EXPLORATION] != 0.0 and us[_JUMPINGOUT] != 0.0:
+            if active[_EXPLORATION] and active[_JUMPINGOUT]:
                 if self.state == _EXPLORATION or self.state == _JUMPINGOUT:
                     self.state = _EXPLORATION
                 else:
                     self.state = _JUMPINGOUT
-
-    def f(self, x:list[float]) -> float:
-        self.fecounter += 1
-        return self.evaluate(x)
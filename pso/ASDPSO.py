@@ -1,9 +1,17 @@
 """ASDPSO.py Adaptive Search Diversification in PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
+from .kernels import asdParameters, asdUpdate
 from functions.problem import Problem
-from random import uniform as rand
 from math import sqrt as sqrt
+import numpy as np
+from typing import Iterator
 
 class ASDParticle(CanonicalParticle):
     def __init__(self, D: int) -> None:
@@ -18,23 +26,29 @@ class ASDParticle(CanonicalParticle):
         self.lastx = [i for i in self.x]
         self.lastfx = self.fx
 
-class ASDPSO:
+class ASDPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._calculateParameters()
             self._updateSwarm()
             if self._updateGbest():
                 # find new gBest
                 p = self.swarm[self.gBestIndex]
-                for d in range(self.dim):
-                    p.v[d] = 0.0
-                    p.x[d] = p.lastx[d] * rand(-0.9, 1.1)
+                lastx = p.lastx.tolist()
+                p.v = 0.0
+                p.x = [lastx[d] * self.rng.uniform(-0.9, 1.1) for d in range(self.dim)]
                 p.fx = self.f(p.x)
                 if self.fitter(p.fx, p.fpbest):
                     p.updatePbest()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -46,10 +60,20 @@ class ASDPSO:
             c2max:float = 3.0,
             wmin:float = 0.4,
             wmax:float = 0.9,
-            initialSwarm:list[ASDParticle] = None
+            initialSwarm:list[ASDParticle] | SwarmState = None,
+            backend:str = "python",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
-        
-        self.f = objectFunction.evaluate
+
+        if backend not in ("python", "numba"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -64,91 +88,132 @@ class ASDPSO:
 
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        self._extraFields = {
+            "lastx": ((self.dim,), float),
+            "lastfx": ((), float),
+            "c1": ((self.dim,), float),
+            "c2": ((self.dim,), float),
+            "w": ((self.dim,), float)
+        }
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, self._extraFields, self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = ASDParticle(self.dim)
-            for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = 0.0
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+        self.swarm = SwarmState(self.popSize, self.dim, self._extraFields, self.evaluator.shared)
+        for i in range(self.popSize):
+            self.swarm.x[i] = [self.rng.uniform(self.lb[d], self.ub[d]) for d in range(self.dim)]
+        # the velocities start at zero
+        self.swarm.v[:] = 0.0
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> bool:
         lastGbestIdx = self.gBestIndex
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
         return self.gBestIndex != lastGbestIdx
 
     def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+        if self.backend == "numba":
+            self._updateSwarmKernel()
+            return
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]   
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
+            c1, c2, w = s.c1[i].tolist(), s.c2[i].tolist(), s.w[i].tolist()
+            fx, lastfx = s.fx[i].item(), s.lastfx[i].item()
             # update particle
             newPosition = [0.0 for _ in range(self.dim)]
             for d in range(self.dim):
                 # update velocity
-                r1 = rand(-1,1) if p.c1[d] == self.c1max else rand(0,1)
-                p.v[d] = p.w[d] * p.v[d] + p.c1[d] * r1 * (p.pbest[d] - p.x[d]) \
-                            + p.c2[d] * rand(0,1) * (gBest.pbest[d] - p.x[d])
-                newPosition[d] = p.x[d] + p.v[d]
+                r1 = self.rng.uniform(-1,1) if c1[d] == self.c1max else self.rng.uniform(0,1)
+                v[d] = w[d] * v[d] + c1[d] * r1 * (pbest[d] - x[d]) \
+                            + c2[d] * self.rng.uniform(0,1) * (gBest[d] - x[d])
+                newPosition[d] = x[d] + v[d]
                 # check whether it is out of domain
                 while (newPosition[d] < self.lb[d]) or (newPosition[d] > self.ub[d]):
-                    p.v[d] = p.v[d] * 0.9 * rand(0,1)
-                    newPosition[d] = p.x[d] + p.v[d]
+                    v[d] = v[d] * 0.9 * self.rng.uniform(0,1)
+                    newPosition[d] = x[d] + v[d]
             # check whether it is stuck
-            if p.lastfx and abs(p.lastfx - p.fx) <= (10 ** (-10)):
+            if lastfx and abs(lastfx - fx) <= (10 ** (-10)):
+                lastx = s.lastx[i].tolist()
                 dis = 0
                 for d in range(self.dim):
-                    dis += (p.lastx[d] - p.x[d]) ** 2
+                    dis += (lastx[d] - x[d]) ** 2
                 dis = sqrt(dis)
                 if dis <= (10 ** (-5)):
                     # stuck
                     for d in range(self.dim):
-                        newPosition[d] = rand(self.lb[d], self.ub[d])
+                        newPosition[d] = self.rng.uniform(self.lb[d], self.ub[d])
             # record the new position
-            p.recordLastPosition()
-            p.x = [x for x in newPosition]
-            p.fx = self.f(p.x)
-            if (self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
+            s.lastx[i] = x
+            s.lastfx[i] = fx
+            s.x[i] = newPosition
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
+
+    def _updateSwarmKernel(self) -> None:
+        s = self.swarm
+        asdUpdate(
+            s.x, s.v, s.pbest, s.pbest[self.gBestIndex].copy(), s.c1, s.c2, s.w,
+            s.lastx, s.lastfx, s.fx, self.lbArray, self.ubArray, float(self.c1max), self.rng.generator
+        )
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
     def _calculateParameters(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+        if self.backend == "numba":
+            s = self.swarm
+            asdParameters(
+                s.x, s.x[self.gBestIndex].copy(), s.c1, s.c2, s.w, float(self.c1max),
+                float(self.c2min), float(self.c2max), float(self.win), float(self.wmax)
+            )
+            return
+        # the loops work on lists, the fields are written back once
+        s = self.swarm
+        X, gBest = s.x.tolist(), s.x[self.gBestIndex].tolist()
+        C1, C2, W = s.c1.tolist(), s.c2.tolist(), s.w.tolist()
         for d in range(self.dim):
             # calculate distances in dimension d
             dis = [0.0 for _ in range(self.popSize)]
             dmax:int = 0
             for i in range(self.popSize):
-                p = self.swarm[i]
-                dis[i] = abs(p.x[d] - gBest.x[d])
+                dis[i] = abs(X[i][d] - gBest[d])
                 if dis[i] > dis[dmax]:
                     dmax = i
             # calculate parameter in dimension d
             for i in range(self.popSize):
-                p = self.swarm[i]
                 # calculate c1 in dimension d
                 alpha = 4 * self.c1max / (dis[dmax] ** 2)
                 if dis[i] > (dis[dmax] / 2):
-                    p.c1[d] = self.c1max
+                    C1[i][d] = self.c1max
                 else:
-                    p.c1[d] = alpha * (dis[i] ** 2)
+                    C1[i][d] = alpha * (dis[i] ** 2)
                 # calculate c2 in dimension d
                 beta = (self.c2max - self.c2min) / (((2/3) * dis[dmax]) ** 2)
                 if dis[i] > (dis[dmax] / 3):
-                    p.c2[d] = self.c2min + beta * ((dis[dmax] - dis[i]) ** 2)
+                    C2[i][d] = self.c2min + beta * ((dis[dmax] - dis[i]) ** 2)
                 else:
-                    p.c2[d] = self.c2max
+                    C2[i][d] = self.c2max
                 # calculate w in dimension d
                 gamma = (self.wmax - self.win) / (dis[dmax] ** 2)
-                p.w[d] = self.win + gamma * (dis[i] ** 2)
+                W[i][d] = self.win + gamma * (dis[i] ** 2)
+        s.c1[:] = C1
+        s.c2[:] = C2
+        s.w[:] = W
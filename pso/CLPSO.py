@@ -1,9 +1,14 @@
 """CLPSO.py Comprehensive learning PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .askTell import AskTell, generationEnd
 from functions.problem import Problem
-from random import uniform as rand, randrange
 from math import exp
+import numpy as np
 
 class CLParticle(CanonicalParticle):
     def __init__(self, D:int, pc:float) -> None:
@@ -12,15 +17,20 @@ class CLParticle(CanonicalParticle):
         self.fi:list[int] = [0 for _ in range(D)]
         self.stagnate = 0
 
-class CLPSO:
+class CLPSO(AskTell, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        self._drive()
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def _evolve(self):
+        while self._running():
             self._updateInertiaWeight()
-            self._updateSwarm()
+            yield from self._updateSwarm()
             self._updateGbest()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield generationEnd
 
     def __init__(
             self,
@@ -32,11 +42,20 @@ class CLPSO:
             wmax:float = 0.9,
             stagnateMax:int = 7,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[CLParticle] = None
+            initialSwarm:list[CLParticle] | SwarmState = None,
+            backend:str = "python",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
-        
-        self.fecounter:int = 0
-        self.evaluate = objectFunction.evaluate
+
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -52,87 +71,157 @@ class CLPSO:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        self._extraFields = {
+            "pc": ((), float),
+            "fi": ((self.dim,), int),
+            "stagnate": ((), int)
+        }
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, self._extraFields, self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
-        for i in range(self.popSize):
-            self._constructFi(i)
+        if self.backend == "numpy":
+            self._constructFiNumpy(np.arange(self.popSize))
+        else:
+            for i in range(self.popSize):
+                self._constructFi(i)
     
     def _initialSwarm(self) -> None:
-        self.swarm = []
+        self.swarm = SwarmState(self.popSize, self.dim, self._extraFields, self.evaluator.shared)
         for i in range(self.popSize):
-            pc = 0.05 + 0.45 * (exp(10 * i / (self.popSize - 1)) - 1) / (exp(10) - 1)
-            newParticle = CLParticle(self.dim, pc)
+            self.swarm.pc[i] = 0.05 + 0.45 * (exp(10 * i / (self.popSize - 1)) - 1) / (exp(10) - 1)
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
-    def _updateSwarm(self) -> None:
+    def _updateSwarm(self):
+        if self.backend == "numpy":
+            yield from self._updateSwarmNumpy()
+            return
+        s = self.swarm
+        dims = np.arange(self.dim)
+        inRange = np.ones(self.popSize, dtype=bool)
         for i in range(self.popSize):
-            p = self.swarm[i]
             # check stagnate
-            if p.stagnate >= self.stMax:
+            if s.stagnate[i] >= self.stMax:
                 self._constructFi(i)
-                p.stagnate = 0
-            inRange = True
+                s.stagnate[i] = 0
+            # the loop works on lists, the rows are written back once
+            x, v = s.x[i].tolist(), s.v[i].tolist()
+            exemplar = s.pbest[s.fi[i], dims].tolist()
             for d in range(self.dim):
                 # update velocity
-                exemplar = self.swarm[p.fi[d]]
-                p.v[d] = self.w * p.v[d] + self.c * rand(0,1) * (exemplar.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(p.v[d], self.vmax[d]))
+                v[d] = self.w * v[d] + self.c * self.rng.uniform(0,1) * (exemplar[d] - x[d])
+                v[d] = max(-self.vmax[d], min(v[d], self.vmax[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                if p.x[d] < self.lb[d] or p.x[d] > self.ub[d]:
-                    inRange = False
-            if inRange:
-                # evaluate fitness and update pbest
-                p.fx = self.f(p.x)
-                p.stagnate += 1
-                if self.fitter(p.fx, p.fpbest):
-                    p.updatePbest()
-                    p.stagnate = 0
+                x[d] = x[d] + v[d]
+                if x[d] < self.lb[d] or x[d] > self.ub[d]:
+                    inRange[i] = False
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest of the particles inside the domain
+        if inRange.any():
+            s.fx[inRange] = yield s.x[inRange]
+        s.stagnate[inRange] += 1
+        improved = inRange & self.fitter(s.fx, s.fpbest)
+        s.updatePbest(improved)
+        s.stagnate[improved] = 0
+
+    def _updateSwarmNumpy(self):
+        s = self.swarm
+        # rebuild the exemplars of every stagnated particle at once
+        stagnated = s.stagnate >= self.stMax
+        if stagnated.any():
+            self._constructFiNumpy(np.flatnonzero(stagnated))
+            s.stagnate[stagnated] = 0
+        # gather the exemplar of every particle in every dimension
+        exemplar = s.pbest[s.fi, np.arange(self.dim)]
+        r = self.rng.generator.uniform(0, 1, s.x.shape)
+        # update velocity
+        s.v[:] = self.w * s.v + self.c * r * (exemplar - s.x)
+        np.clip(s.v, -self.vmaxArray, self.vmaxArray, out=s.v)
+        # update position
+        s.x += s.v
+        inRange = ((s.x >= self.lbArray) & (s.x <= self.ubArray)).all(axis=1)
+        # evaluate fitness and update pbest of the particles inside the domain
+        if inRange.any():
+            s.fx[inRange] = yield s.x[inRange]
+        s.stagnate[inRange] += 1
+        improved = inRange & self.fitter(s.fx, s.fpbest)
+        s.updatePbest(improved)
+        s.stagnate[improved] = 0
+
+    def _constructFiNumpy(self, idx:np.ndarray) -> None:
+        """
+        _constructFi for the particles idx at once, the tournament pairs are
+        drawn without rejection by shifting indices past the excluded ones
+        """
+        s = self.swarm
+        shape = (len(idx), self.dim)
+        own = idx[:, None]
+        learn = self.rng.generator.uniform(0, 1, shape) < s.pc[own]
+        # choose two other particles
+        idx1 = self.rng.generator.integers(0, self.popSize - 1, shape)
+        idx1 += idx1 >= own
+        idx2 = self.rng.generator.integers(0, self.popSize - 2, shape)
+        idx2 += idx2 >= np.minimum(own, idx1)
+        idx2 += idx2 >= np.maximum(own, idx1)
+        winner = np.where(self.fitter(s.fpbest[idx1], s.fpbest[idx2]), idx1, idx2)
+        fi = np.where(learn, winner, own)
+        # a particle learning only from itself copies one dimension from another
+        allPbest = np.flatnonzero(~learn.any(axis=1))
+        if len(allPbest):
+            mutate = self.rng.generator.integers(0, self.dim, len(allPbest))
+            idx3 = self.rng.generator.integers(0, self.popSize - 1, len(allPbest))
+            idx3 += idx3 >= idx[allPbest]
+            fi[allPbest, mutate] = idx3
+        s.fi[idx] = fi
 
     def _constructFi(self, idx:int) -> None:
         p = self.swarm[idx]
         allPbest = True
         for d in range(self.dim):
             p.fi[d] = idx
-            if rand(0,1) < p.pc:
+            if self.rng.uniform(0,1) < p.pc:
                 # choose two other particles
-                idx1 = randrange(0, self.popSize)
+                idx1 = self.rng.randrange(0, self.popSize)
                 while idx1 == idx:
-                    idx1 = randrange(0, self.popSize)
-                idx2 = randrange(0, self.popSize)
+                    idx1 = self.rng.randrange(0, self.popSize)
+                idx2 = self.rng.randrange(0, self.popSize)
                 while idx2 == idx or idx2 == idx1:
-                    idx2 = randrange(0, self.popSize)
+                    idx2 = self.rng.randrange(0, self.popSize)
                 if self.fitter(self.swarm[idx1].fpbest, self.swarm[idx2].fpbest):
                     p.fi[d] = idx1
                 else:
                     p.fi[d] = idx2
                 allPbest = False
         if allPbest:
-            mutate = randrange(0, self.dim)
-            idx3 = randrange(0, self.popSize)
+            mutate = self.rng.randrange(0, self.dim)
+            idx3 = self.rng.randrange(0, self.popSize)
             while idx3 == idx:
-                idx3 = randrange(0, self.popSize)
+                idx3 = self.rng.randrange(0, self.popSize)
             p.fi[mutate] = idx3
             
     def _updateInertiaWeight(self) -> None:
         self.W = self.wmax - (self.wmax - self.wmin) * (self.g / self.G)
-
-    def f(self, x:list[float]) -> float:
-        self.fecounter += 1
-        return self.evaluate(x)
\ No newline at end of file
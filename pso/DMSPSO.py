@@ -1,24 +1,39 @@
 """DMSPSO.py dynamic multi-swarm PSO
 """
 from .vonNeumannPSO import ParticleWithNeighbours
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .askTell import AskTell, generationEnd
+from .topology import clusters
 from functions.problem import Problem
-from random import uniform as rand
-from random import shuffle as shuffle
+import numpy as np
 
-class DMSPSO:
+class DMSPSO(AskTell, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        globalMode = False
-        while self.g < self.G:
-            self._updateSwarm(globalMode)
-            self._updateGbest()
-            self._updateInertiaWeight()
-            self.g += 1
-            if not globalMode and self.g % self.R == 0:
-                self._regroup()
-            if not globalMode and self.g >= 0.9 * self.G:
-                globalMode = True
+        self._drive()
         gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def _evolve(self):
+        while self._running():
+            yield from self._generation()
+            self._afterGeneration()
+            yield generationEnd
+
+    def _generation(self):
+        """
+        one generation, regrouping included
+        """
+        yield from self._updateSwarm(self.globalMode)
+        self._updateGbest()
+        self._updateInertiaWeight()
+        self.g += 1
+        if not self.globalMode and self.g % self.R == 0:
+            self._regroup()
+        if not self.globalMode and self.g >= 0.9 * self.G:
+            self.globalMode = True
 
     def __init__(
             self,
@@ -32,10 +47,15 @@ class DMSPSO:
             wmin:float = 0.2,
             wmax:float = 0.9,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[ParticleWithNeighbours] = None
+            initialSwarm:list[ParticleWithNeighbours] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
         
-        self.f = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -50,13 +70,15 @@ class DMSPSO:
         self.wmax = wmax
         self.w = self.wmax
         self.g = 0
+        self.globalMode = False
 
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         self._regroup()
 
@@ -64,58 +86,54 @@ class DMSPSO:
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = ParticleWithNeighbours(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _regroup(self) -> None:
-        permutation = [x for x in range(self.popSize)]
-        shuffle(permutation)
-        for subSwarmIdx in range(0, self.popSize, self.subSwarmSize):
-            for offset in range(self.subSwarmSize):
-                curIdx = subSwarmIdx + offset
-                curP = self.swarm[permutation[curIdx]]
-                curP.neighbours.clear()
-                for neighbor in range(self.subSwarmSize):
-                    neighborIdx = subSwarmIdx + neighbor
-                    if neighborIdx != curIdx:
-                        curP.neighbours.append(self.swarm[permutation[neighborIdx]])
+        # a random permutation cut into the sub-swarms
+        groups = self.rng.generator.permutation(self.popSize).reshape(-1, self.subSwarmSize)
+        self.topology = clusters(groups)
     
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
-    def _updateSwarm(self, globalMode:bool) -> None:
+    def _updateSwarm(self, globalMode:bool):
+        s = self.swarm
+        if not globalMode:
+            # pbest does not change before the evaluation, find every lbest at once
+            lbestIdx = self.topology.localBest(self.fitter, s.fpbest)
+        else:
+            gBest = s.pbest[self.gBestIndex].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
-            exemplar = self.swarm[self.gBestIndex] if globalMode else self._getLocalBest(i)
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
+            exemplar = gBest if globalMode else s.pbest[lbestIdx[i]].tolist()
             for d in range(self.dim):
                 # update velocity
-                p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (exemplar.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (exemplar[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if(self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
-
-    def _getLocalBest(self, idx:int) -> ParticleWithNeighbours:
-        p = self.swarm[idx]
-        res = p
-        for n in p.neighbours:
-            if self.fitter(n.fpbest, res.fpbest):
-                res = n
-        return res
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        self.swarm.fx[:] = yield self.swarm.x
+        self.swarm.updatePbest(self.fitter(self.swarm.fx, self.swarm.fpbest))
 
     def _updateInertiaWeight(self) -> None:
         self.w = self.wmax - (self.wmax - self.wmin) * (self.g / self.G)
\ No newline at end of file
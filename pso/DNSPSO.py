@@ -1,18 +1,32 @@
 """DNSPSO.py Diversity enhancing mechanism and neighborhood search strategies PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
+from .topology import ring
 from functions.problem import Problem
-from random import uniform as rand, sample
+import numpy as np
+from typing import Iterator
 
-class DNSPSO:
+class DNSPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._updateSwarm()
             self._updateGbest()
             self._neighborhoodSearch()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -26,10 +40,20 @@ class DNSPSO:
             pr:float = 0.9,
             pns:float = 0.6,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[CanonicalParticle] = None
+            initialSwarm:list[CanonicalParticle] | SwarmState = None,
+            backend:str = "python",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
-        
-        self.f = objectFunction.evaluate
+
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -46,64 +70,105 @@ class DNSPSO:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
+        # neighbourhood of the local neighbourhood search, the global one is
+        # every other particle and is sampled by _twoOthers
+        self.localTopology = ring(self.popSize, self.k)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = CanonicalParticle(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+        if self.backend == "numpy":
+            self._updateSwarmNumpy()
+            return
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
+        tp = s.x.copy()
         for i in range(self.popSize):
-            p = self.swarm[i]
-            tp = [t for t in p.x]
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
             for d in range(self.dim):
                 # update velocity
-                p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (gBest.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.x[d]))
+                v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (gBest[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], x[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness
-            p.fx = self.f(p.x)
-            # generate trial particle
-            for d in range(self.dim):
-                if rand(0,1) < self.pr:
-                    tp[d] = p.x[d]
-            # test the trial particle
-            ftp = self.f(tp)
-            if self.fitter(ftp, p.fx):
-                p.x = [i for i in tp]
-                p.fx = ftp
-            if self.fitter(p.fx, p.fpbest):
-                p.updatePbest()
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness
+        s.fx[:] = self.fBatch(s.x)
+        # generate trial particles
+        cross = np.array([[self.rng.uniform(0,1) < self.pr for _ in range(self.dim)]
+                                for _ in range(self.popSize)])
+        tp[cross] = s.x[cross]
+        # test the trial particles
+        ftp = self.fBatch(tp)
+        better = self.fitter(ftp, s.fx)
+        s.x[better] = tp[better]
+        s.fx[better] = ftp[better]
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
+
+    def _updateSwarmNumpy(self) -> None:
+        s = self.swarm
+        tp = s.x.copy()
+        # update velocity, the python loop clamps the position into it and
+        # discards the inertia/cognitive/social term, so it is not computed
+        np.clip(s.x, -self.vmaxArray, self.vmaxArray, out=s.v)
+        # update position
+        s.x += s.v
+        np.clip(s.x, self.lbArray, self.ubArray, out=s.x)
+        # evaluate fitness
+        s.fx[:] = self.fBatch(s.x)
+        # generate trial particles
+        trial = self.rng.generator.uniform(0, 1, s.x.shape) < self.pr
+        tp[trial] = s.x[trial]
+        # test the trial particles
+        ftp = self.fBatch(tp)
+        better = self.fitter(ftp, s.fx)
+        s.x[better] = tp[better]
+        s.fx[better] = ftp[better]
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
     def _neighborhoodSearch(self) -> None:
+        s = self.swarm
+        gbest = s.pbest[self.gBestIndex].tolist()
+        searchIdx:list[int] = []
+        positions:list[list[float]] = []
         for i in range(self.popSize):
-            gbest = self.swarm[self.gBestIndex]
-            p = self.swarm[i]
-            if rand(0,1) < self.pns:
+            if self.rng.uniform(0,1) < self.pns:
+                x, pbest = s.x[i].tolist(), s.pbest[i].tolist()
                 # neighbourhood search
-                r = [rand(0,1) for _ in range(6)]
+                r = [self.rng.uniform(0,1) for _ in range(6)]
                 sum1 = r[0] + r[1] + r[2]
                 sum2 = r[3] + r[4] + r[5]
                 for t in range(3):
@@ -111,35 +176,56 @@ class DNSPSO:
                     r[t + 3] = r[t + 3] / sum2
                 # LNS
                 # choose two different neighbours
-                ln = sample([(i + n) % self.popSize for n in range(-self.k, self.k + 1) if n != 0], k = 2)
-                pc = self.swarm[ln[0]]
-                pd = self.swarm[ln[1]]
+                ln = self.rng.sample(self.localTopology.neighboursOf(i).tolist(), k = 2)
+                pc, pd = s.x[ln[0]].tolist(), s.x[ln[1]].tolist()
                 lposition = [0.0 for _ in range(self.dim)]
                 for d in range(self.dim):
-                    lposition[d] = r[0] * p.x[d] + r[1] * p.pbest[d] \
-                                    + r[2] * (pc.x[d] - pd.x[d])
+                    lposition[d] = r[0] * x[d] + r[1] * pbest[d] \
+                                    + r[2] * (pc[d] - pd[d])
                     lposition[d] = max(self.lb[d], min(self.ub[d], lposition[d]))
                 # GNS
                 # choose two different neighbours
-                gn = sample([n for n in range(self.popSize) if n != i], k = 2)
-                pe = self.swarm[gn[0]]
-                pf = self.swarm[gn[1]]
+                gn = self._twoOthers(i)
+                pe, pf = s.x[gn[0]].tolist(), s.x[gn[1]].tolist()
                 gposition = [0.0 for _ in range(self.dim)]
                 for d in range(self.dim):
-                    gposition[d] = r[3] * p.x[d] + r[4] * gbest.pbest[d] \
-                                    + r[5] * (pe.x[d] - pf.x[d])
+                    gposition[d] = r[3] * x[d] + r[4] * gbest[d] \
+                                    + r[5] * (pe[d] - pf[d])
                     gposition[d] = max(self.lb[d], min(self.ub[d], gposition[d]))
-                # evaluate and exchange
-                flp = self.f(lposition)
-                fgp = self.f(gposition)
-                if self.fitter(flp, p.fx):
-                    p.x = [d for d in lposition]
-                    p.fx = flp
-                if self.fitter(fgp, p.fx):
-                    p.x = [d for d in gposition]
-                    p.fx = fgp
-                # update pbest and gbest
-                if self.fitter(p.fx, p.fpbest):
-                    p.updatePbest()
-                    if self.fitter(p.fpbest, gbest.fpbest):
-                        self.gBestIndex = i
+                searchIdx.append(i)
+                positions.append(lposition)
+                positions.append(gposition)
+        if not searchIdx:
+            return
+        # evaluate all searched positions at once
+        fvals = self.fBatch(np.array(positions))
+        fpbest = s.fpbest
+        for k, i in enumerate(searchIdx):
+            p = self.swarm[i]
+            lposition, gposition = positions[2 * k], positions[2 * k + 1]
+            flp, fgp = fvals[2 * k], fvals[2 * k + 1]
+            # exchange
+            if self.fitter(flp, p.fx):
+                p.x = lposition
+                p.fx = flp
+            if self.fitter(fgp, p.fx):
+                p.x = gposition
+                p.fx = fgp
+            # update pbest and gbest
+            if self.fitter(p.fx, p.fpbest):
+                p.updatePbest()
+                if self.fitter(p.fpbest, fpbest[self.gBestIndex]):
+                    self.gBestIndex = i
+
+    def _twoOthers(self, idx:int) -> list[int]:
+        """
+        two distinct particles other than idx, drawn uniformly without
+        building the list of all the others
+        """
+        e = self.rng.randrange(self.popSize - 1)
+        e += e >= idx
+        f = self.rng.randrange(self.popSize - 2)
+        # skip idx and e in increasing order
+        for skip in sorted((idx, e)):
+            f += f >= skip
+        return [e, f]
@@ -1,9 +1,14 @@
 """ EPSO.py Extraordinariness PSO
 """
-from .common import BaseParticle
+from .common import BaseParticle, SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
 from functions.problem import Problem
-from random import uniform as rand
-from typing import Callable
+from typing import Callable, Iterator
+import numpy as np
 
 class ExtraParticle(BaseParticle):
     def __init__(self, D:int, fitter:Callable[[float,  float], bool]) -> None:
@@ -14,15 +19,21 @@ class ExtraParticle(BaseParticle):
     def __eq__(self, other:"ExtraParticle") -> bool:
         return self.fpbest == other.fpbest
 
-class EPSO:
+class EPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
-            self.swarm.sort(reverse=True)
+        for _ in self.iterate():
+            pass
+        self._sortSwarm()
+        gbest = self.swarm[0]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
+            self._sortSwarm()
             self._updateSwarm()
             self.g += 1
-        self.swarm.sort(reverse=True)
-        gbest = self.swarm[0]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -31,11 +42,17 @@ class EPSO:
             maxGeneration:int = 4000,
             c:float = 0.3,
             alpha:float = 0.8,
-            initialSwarm:list[ExtraParticle] = None
+            initialSwarm:list[ExtraParticle] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
         
-        self.f = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
+        self.minimize = objectFunction.minimize
 
         self.dim = objectFunction.D
         self.popSize = populationSize
@@ -47,36 +64,39 @@ class EPSO:
 
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = ExtraParticle(self.dim, self.fitter)
-            for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            self.swarm.x[i] = [self.rng.uniform(self.lb[d], self.ub[d]) for d in range(self.dim)]
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
+
+    def _sortSwarm(self) -> None:
+        # best pbest first, ties keep their order (same as sort(reverse=True) on ExtraParticle)
+        key = self.swarm.fpbest if self.minimize else -self.swarm.fpbest
+        self.swarm.reorder(np.argsort(key, kind="stable"))
 
     def _updateSwarm(self) -> None:
+        s = self.swarm
         for i in range(self.popSize):
-            p = self.swarm[i]
-            exemplarIdx = round(rand(0,1) * self.popSize)
+            exemplarIdx = round(self.rng.uniform(0,1) * self.popSize)
             if exemplarIdx < self.Tup:
-                # learn from exemplar
-                exemplar = self.swarm[exemplarIdx]
-                for d in range(self.dim):
-                    p.x[d] = p.x[d] + self.c * (exemplar.pbest[d] - p.x[d])
-                    p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
+                # learn from exemplar, the whole row at once
+                x = s.x[i]
+                x += self.c * (s.pbest[exemplarIdx] - x)
+                np.clip(x, self.lbArray, self.ubArray, out=x)
             else:
                 # random search
-                for d in range(self.dim):
-                    p.x[d] = rand(self.lb[d], self.ub[d])
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if (self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
\ No newline at end of file
+                s.x[i] = [self.rng.uniform(self.lb[d], self.ub[d]) for d in range(self.dim)]
+        # evaluate fitness and update pbest
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest(self.fitter(self.swarm.fx, self.swarm.fpbest))
\ No newline at end of file
@@ -1,18 +1,31 @@
 """FDRPSO.py Fitness-distance-ratio based PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
 from functions.problem import Problem
-from random import uniform as rand
+import numpy as np
+from typing import Iterator
 
-class FDRPSO:
+class FDRPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._updateSwarm()
             self._updateGbest()
             self._updateInertiaWeight()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -25,11 +38,15 @@ class FDRPSO:
             wmin:float = 0.4,
             wmax:float = 0.9,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[CanonicalParticle] = None
+            initialSwarm:list[CanonicalParticle] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
         
-        self.fecounter:int = 0
-        self.evaluate = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
         self.theta = -1 if objectFunction.minimize else 1
 
@@ -48,69 +65,78 @@ class FDRPSO:
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = CanonicalParticle(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
     def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
+        # find nbest of every particle in every dimension
+        nbests = s.pbest[self._FDR(), np.arange(self.dim)].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
+            # the loop works on lists, the rows are written back once
+            x, v, pbest, nbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist(), nbests[i]
             for d in range(self.dim):
-                # find nbest in dimension d
-                nbestIdx = self._FDR(i, d)
-                nbest = self.swarm[nbestIdx]
                 # update velocity
-                p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (gBest.pbest[d] - p.x[d]) \
-                                + self.c3 * rand(0,1) * (nbest.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(p.v[d], self.vmax[d]))
+                v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (gBest[d] - x[d]) \
+                                + self.c3 * self.rng.uniform(0,1) * (nbest[d] - x[d])
+                v[d] = max(-self.vmax[d], min(v[d], self.vmax[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(p.x[d], self.ub[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if self.fitter(p.fx, p.fpbest):
-                p.updatePbest()
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(x[d], self.ub[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
     def _updateInertiaWeight(self) -> None:
         self.w = self.wmax - (self.wmax - self.wmin) * (self.g / self.G)
     
-    def _FDR(self, targetIdx:int, d:int) -> int:
-        # find nbest index for particle targetIdx of dimension d
-        p = self.swarm[targetIdx]
-        fdrnum = self.theta * (p.fpbest - p.fx)
-        fdrden = abs(p.pbest[d] - p.x[d])
-        nbestIdx = targetIdx
+    def _FDR(self) -> np.ndarray:
+        """
+        (N, D) nbest index of every particle in every dimension, the
+        candidates j are scanned in order for all (i, d) at once with the
+        cross-multiplied comparison of the per-pair scan, which is not a
+        total order once a distance is 0, so the choices stay identical
+        """
+        s = self.swarm
+        # fitness differences of the candidates, (N, N), and starting point i itself
+        fdrnums = self.theta * (s.fpbest[None, :] - s.fx[:, None])
+        fdrnum = np.repeat(np.diagonal(fdrnums)[:, None], self.dim, axis=1)
+        fdrden = np.abs(s.pbest - s.x)
+        nbestIdx = np.repeat(np.arange(self.popSize)[:, None], self.dim, axis=1)
         for j in range(self.popSize):
-            n = self.swarm[j]
-            newfdrnum = self.theta * (n.fpbest - p.fx)
-            newfdrden = abs(n.pbest[d] - p.x[d])
-            if newfdrnum * fdrden > fdrnum * newfdrden:
-                fdrnum = newfdrnum
-                fdrden = newfdrden
-                nbestIdx = j
+            newfdrnum = fdrnums[:, j, None]
+            newfdrden = np.abs(s.pbest[j] - s.x)
+            better = newfdrnum * fdrden > fdrnum * newfdrden
+            fdrnum = np.where(better, newfdrnum, fdrnum)
+            fdrden = np.where(better, newfdrden, fdrden)
+            nbestIdx[better] = j
         return nbestIdx
-
-    def f(self, x:list[float]) -> float:
-        self.fecounter += 1
-        return self.evaluate(x)
\ No newline at end of file
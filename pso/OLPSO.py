@@ -1,9 +1,16 @@
 """OLPSO.py Orthogonal Learning PSO
 """
 from pso.canonicalPSO import CanonicalParticle
+from .common import SwarmState, bestIndexOf
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
 from functions.problem import Problem
-from random import uniform as rand, randrange as randrange
-from math import ceil, log2, floor
+from math import ceil, log2
+import numpy as np
+from typing import Iterator
 
 class OLParticle(CanonicalParticle):
     def __init__(self, D: int) -> None:
@@ -11,16 +18,22 @@ class OLParticle(CanonicalParticle):
         self.guideIdx:list[int] = [0 for _ in range(D)]
         self.stagnate = 0
 
-class OLPSO:
+class OLPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._updateSwarm()
             self._updateGbest()
             self._updateGuidance()
             self._updateInertiaWeight()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return(gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -32,10 +45,15 @@ class OLPSO:
             wmax:float = 0.9,
             stagnateMax:int = 5,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[OLParticle] = None
+            initialSwarm:list[OLParticle] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
 
-        self.f = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -52,8 +70,13 @@ class OLPSO:
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        self._extraFields = {
+            "guideIdx": ((self.dim,), int),
+            "stagnate": ((), int)
+        }
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, self._extraFields, self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
@@ -64,111 +87,102 @@ class OLPSO:
             self._constructGuidance(i)
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = OLParticle(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, self._extraFields, self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
     def _updateSwarm(self) -> None:
+        s = self.swarm
+        # the exemplar of every particle and dimension, pbest does not change before the evaluation
+        guides = s.pbest[s.guideIdx, np.arange(self.dim)].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
+            # the loop works on lists, the rows are written back once
+            x, v, exemplar = s.x[i].tolist(), s.v[i].tolist(), guides[i]
             for d in range(self.dim):
                 # update velocity
-                exemplar = self.swarm[p.guideIdx[d]]
-                p.v[d] = self.w * p.v[d] + self.c * rand(0,1) * (exemplar.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = self.w * v[d] + self.c * self.rng.uniform(0,1) * (exemplar[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            p.stagnate += 1
-            if(self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
-                p.stagnate = 0
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.stagnate += 1
+        improved = self.fitter(s.fx, s.fpbest)
+        s.updatePbest(improved)
+        s.stagnate[improved] = 0
     
     def _updateGuidance(self) -> None:
-        for i in range(self.popSize):
-            p = self.swarm[i]
-            if p.stagnate > self.stMax:
-                self._constructGuidance(i)
+        # a reconstruction only resets the stagnation of its own particle
+        for i in np.flatnonzero(self.swarm.stagnate > self.stMax).tolist():
+            self._constructGuidance(i)
 
     def _updateInertiaWeight(self) -> None:
         self.w = self.wmax - (self.wmax - self.wmin) * (self.g / self.G)
 
     def _constructGuidance(self, idx:int) -> None:
-        p = self.swarm[idx]
-        p.stagnate = 0
+        s = self.swarm
+        s.stagnate[idx] = 0
         # find exemplar
         exemplarIdx = self.gBestIndex
         while exemplarIdx == idx:
-            exemplarIdx = randrange(0, self.popSize)
-        exemplar = self.swarm[exemplarIdx]
-        # construct test set
-        x:list[list[float]] = [[0.0 for _ in range(self.dim)] for _ in range(len(self._OA))]
-        fx = [0.0 for _ in range(len(self._OA))]
-        xBest:int = 0
-        for j in range(len(self._OA)):
-            for d in range(self.dim):
-                x[j][d] = p.pbest[d] if self._OA[j][d] == 1 else exemplar.pbest[d]
-            fx[j] = self.f(x[j])
-            if self.fitter(fx[j], fx[xBest]):
-                xBest = j
-        # calculate xp
-        xp = [0.0 for _ in range(self.dim)]
-        for d in range(self.dim):
-            levelPbest = 0.0
-            levelExemplar = 0.0
-            for case in self._oneIdx[d]:
-                levelPbest = levelPbest + fx[case]
-            for case in self._twoIdx[d]:
-                levelExemplar = levelExemplar + fx[case]
-            levelPbest = levelPbest / len(self._oneIdx)
-            levelExemplar = levelExemplar / len(self._twoIdx)
-            if self.fitter(levelPbest, levelExemplar):
-                xp[d] = p.pbest[d]
-                p.guideIdx[d] = idx
-            else:
-                xp[d] = exemplar.pbest[d]
-                p.guideIdx[d] = exemplarIdx
-        fxp = self.f(xp)
+            exemplarIdx = self.rng.randrange(0, self.popSize)
+        pbest = s.pbest[idx]
+        exemplar = s.pbest[exemplarIdx]
+        # construct the test set and evaluate it at once
+        fx = self.fBatch(np.where(self._OA, pbest, exemplar))
+        xBest = bestIndexOf(self.fitter, fx)
+        # calculate xp from the mean fitness of the two levels of every factor
+        levelPbest = np.where(self._OA, fx[:, None], 0.0).sum(axis=0) / self.dim
+        levelExemplar = np.where(self._OA, 0.0, fx[:, None]).sum(axis=0) / self.dim
+        usePbest = self.fitter(levelPbest, levelExemplar)
+        xp = np.where(usePbest, pbest, exemplar)
+        s.guideIdx[idx] = np.where(usePbest, idx, exemplarIdx)
+        fxp = self.f(xp.tolist())
         if self.fitter(fx[xBest], fxp):
-            for d in range(self.dim):
-                if self._OA[xBest][d] == 1:
-                    p.guideIdx[d] = idx
-                else:
-                    p.guideIdx[d] = exemplarIdx
+            s.guideIdx[idx] = np.where(self._OA[xBest], idx, exemplarIdx)
 
     def _generateOA(self, factorNum:int) -> None:
-        n = 2 ** (ceil(log2(factorNum + 1)))
-        self._OA = [[0 for _ in range(factorNum)] for _ in range(n)]
-        for i in range(1, n + 1):
-            for j in range(1, factorNum + 1):
-                level = 0
-                k = j
-                mask = n / 2
-                while k > 0:
-                    if (k % 2) and (((i-1) & int(mask)) != 0):
-                        level = (level + 1) % 2
-                    k = floor(k / 2)
-                    mask = mask / 2
-                self._OA[i - 1][j - 1] = level + 1
-
-        self._oneIdx:list[list[int]] = [[] for _ in range(factorNum)]
-        self._twoIdx:list[list[int]] = [[] for _ in range(factorNum)]
-        for i in range(n):
-            for j in range(factorNum):
-                if self._OA[i][j] == 1:
-                    self._oneIdx[j].append(i)
-                else:
-                    self._twoIdx[j].append(i)
\ No newline at end of file
+        self._OA = orthogonalArray(factorNum)
+
+def orthogonalArray(factorNum:int) -> np.ndarray:
+    """
+    two-level orthogonal array L_n(2^factorNum), n = 2^ceil(log2(factorNum + 1)),
+    as an (n, factorNum) read-only bool table, True for level 1 (take pbest),
+    built once per factorNum and shared by every instance
+    """
+    if factorNum not in _oaCache:
+        bits = ceil(log2(factorNum + 1))
+        rows = np.arange(2 ** bits, dtype=np.int64)
+        # bit b of the column number meets bit (bits - 1 - b) of the row number
+        reversedRows = np.zeros_like(rows)
+        for b in range(bits):
+            reversedRows |= ((rows >> b) & 1) << (bits - 1 - b)
+        level = reversedRows[:, None] & np.arange(1, factorNum + 1, dtype=np.int64)
+        # parity of the common bits is the level
+        for shift in (32, 16, 8, 4, 2, 1):
+            level ^= level >> shift
+        table = (level & 1) == 0
+        table.setflags(write=False)
+        _oaCache[factorNum] = table
+    return _oaCache[factorNum]
+
+# orthogonal arrays by number of factors
+_oaCache:dict[int, np.ndarray] = {}
@@ -1,23 +1,37 @@
 """RVUPSO.py Relaxation velocity update PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
+from .kernels import rvuUpdate
 from functions.problem import Problem
-from random import uniform as rand
+import numpy as np
+from typing import Iterator
 
 class RVUParticle(CanonicalParticle):
     def __init__(self, D: int) -> None:
         super().__init__(D)
         self.updateV:bool = False
 
-class RVUPSO:
+class RVUPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._updateSwarm()
             self._updateGbest()
             self._updateInertiaWeight()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -29,10 +43,20 @@ class RVUPSO:
             wmin:float = 0.4,
             wmax:float = 0.9,
             vmaxPercent:float = 1.0,
-            initialSwarm:list[RVUParticle] = None
+            initialSwarm:list[RVUParticle] | SwarmState = None,
+            backend:str = "python",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
-        
-        self.f = objectFunction.evaluate
+
+        if backend not in ("python", "numpy", "numba"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -48,53 +72,100 @@ class RVUPSO:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        self._extraFields = {"updateV": ((), bool)}
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, self._extraFields, self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = RVUParticle(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, self._extraFields, self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updateV = False
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        self.swarm.updateV[:] = False
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
     def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+        if self.backend == "numpy":
+            self._updateSwarmNumpy()
+            return
+        if self.backend == "numba":
+            self._updateSwarmKernel()
+            return
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
+        oldFx = s.fx.copy()
         for i in range(self.popSize):
-            p = self.swarm[i]
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
+            updateV = s.updateV[i].item()
             for d in range(self.dim):
-                if p.updateV:
+                if updateV:
                     # update velocity
-                    p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                                + self.c2 * rand(0,1) * (gBest.pbest[d] - p.x[d])
-                    p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                    v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                                + self.c2 * self.rng.uniform(0,1) * (gBest[d] - x[d])
+                    v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            oldFx = p.fx
-            p.fx = self.f(p.x)
-            if self.fitter(oldFx, p.fx):
-                p.updateV = True
-            else:
-                p.updateV = False
-            if self.fitter(p.fx, p.fpbest):
-                p.updatePbest()
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.updateV[:] = self.fitter(oldFx, s.fx)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
+
+    def _updateSwarmNumpy(self) -> None:
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex]
+        r1 = self.rng.generator.uniform(0, 1, s.x.shape)
+        r2 = self.rng.generator.uniform(0, 1, s.x.shape)
+        # update velocity of the particles which got worse
+        u = s.updateV
+        v = self.w * s.v[u] + self.c1 * r1[u] * (s.pbest[u] - s.x[u]) \
+                + self.c2 * r2[u] * (gBest - s.x[u])
+        s.v[u] = np.clip(v, -self.vmaxArray, self.vmaxArray)
+        # update position
+        s.x += s.v
+        np.clip(s.x, self.lbArray, self.ubArray, out=s.x)
+        # evaluate fitness and update pbest
+        oldFx = s.fx.copy()
+        s.fx[:] = self.fBatch(s.x)
+        s.updateV[:] = self.fitter(oldFx, s.fx)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
+
+    def _updateSwarmKernel(self) -> None:
+        s = self.swarm
+        rvuUpdate(
+            s.x, s.v, s.pbest, s.pbest[self.gBestIndex].copy(), s.updateV, float(self.w),
+            float(self.c1), float(self.c2), self.vmaxArray, self.lbArray, self.ubArray, self.rng.generator
+        )
+        # evaluate fitness and update pbest
+        oldFx = s.fx.copy()
+        s.fx[:] = self.fBatch(s.x)
+        s.updateV[:] = self.fitter(oldFx, s.fx)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
     def _updateInertiaWeight(self) -> None:
         self.w = self.wmax - (self.wmax - self.wmin) * (self.g / self.G)
\ No newline at end of file
@@ -1,9 +1,16 @@
 """SAPSOMVS.py Self-adaptive PSO with multiple velocity strategies
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
+from .kernels import sapsomvsUpdate
 from functions.problem import Problem
-from random import uniform as rand
-from scipy.stats import cauchy
+import numpy as np
+from typing import Iterator
 
 class SAPSOMVSParticle(CanonicalParticle):
     def __init__(self, D: int) -> None:
@@ -12,15 +19,21 @@ class SAPSOMVSParticle(CanonicalParticle):
         self.c2:float = None
         self.w:float = None
 
-class SAPSOMVS:
+class SAPSOMVS(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._updateSwarm()
             self._updateParameters()
             self._updateGbest()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -36,10 +49,20 @@ class SAPSOMVS:
             selectionProbability:float = 0.8,
             clipProbability:float = 0.7,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[SAPSOMVSParticle] = None
+            initialSwarm:list[SAPSOMVSParticle] | SwarmState = None,
+            backend:str = "python",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
-        
-        self.f = objectFunction.evaluate
+
+        if backend not in ("python", "numba"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -58,9 +81,18 @@ class SAPSOMVS:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        self._extraFields = {
+            "c1": ((), float),
+            "c2": ((), float),
+            "w": ((), float)
+        }
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, self._extraFields, self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
@@ -68,22 +100,26 @@ class SAPSOMVS:
         self._updateParameters()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = SAPSOMVSParticle(self.dim)
-            newParticle.c1 = self.initc1
-            newParticle.c2 = self.initc2
-            newParticle.w = self.initw
+        self.swarm = SwarmState(self.popSize, self.dim, self._extraFields, self.evaluator.shared)
+        self.swarm.c1[:] = self.initc1
+        self.swarm.c2[:] = self.initc2
+        self.swarm.w[:] = self.initw
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
     def _updateSwarm(self) -> None:
@@ -91,68 +127,86 @@ class SAPSOMVS:
         dt1 = 0.1
         mu2 = 0.4 * (1 - (self.g / self.G) ** 2) + 0.2
         dt2 = 0.4
-        cauchymu1dt1 = cauchy.rvs(loc=mu1, scale=dt1, size=self.popSize * 2)
-        cauchymu2dt2 = cauchy.rvs(loc=mu2, scale=dt2, size=self.popSize * 2)
-        gBest = self.swarm[self.gBestIndex]
+        cauchymu1dt1 = self.rng.cauchy(loc=mu1, scale=dt1, size=self.popSize * 2)
+        cauchymu2dt2 = self.rng.cauchy(loc=mu2, scale=dt2, size=self.popSize * 2)
+        if self.backend == "numba":
+            self._updateSwarmKernel(cauchymu1dt1, cauchymu2dt2)
+            return
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
-            if rand(0,1) > self.sp:
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
+            w, c1, c2 = s.w[i].item(), s.c1[i].item(), s.c2[i].item()
+            if self.rng.uniform(0,1) > self.sp:
                 # uniform random number
                 for d in range(self.dim):
-                    p.v[d] = p.w * p.v[d] + p.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                                + p.c2 * rand(0,1) * (gBest.pbest[d] - p.x[d])
+                    v[d] = w * v[d] + c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                                + c2 * self.rng.uniform(0,1) * (gBest[d] - x[d])
             else:
                 # cauchy random number
                 cauchy1 = cauchymu1dt1[i]
                 cauchy2 = cauchymu1dt1[i + 1]
-                if rand(0,1) > 0.5:
+                if self.rng.uniform(0,1) > 0.5:
                     cauchy1 = cauchymu2dt2[i]
                     cauchy2 = cauchymu2dt2[i + 1]
                 for d in range(self.dim):
-                    p.v[d] = p.w * p.v[d] + p.c1 * cauchy1 * (p.pbest[d] - p.x[d]) \
-                                + p.c2 * cauchy2 * (gBest.pbest[d] - p.x[d])
+                    v[d] = w * v[d] + c1 * cauchy1 * (pbest[d] - x[d]) \
+                                + c2 * cauchy2 * (gBest[d] - x[d])
             for d in range(self.dim):
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                if p.x[d] > self.ub[d] or p.x[d] < self.lb[d]:
-                    if rand(0,1) > self.cp:
-                        p.x[d] = rand(self.lb[d], self.ub[d])
+                x[d] = x[d] + v[d]
+                if x[d] > self.ub[d] or x[d] < self.lb[d]:
+                    if self.rng.uniform(0,1) > self.cp:
+                        x[d] = self.rng.uniform(self.lb[d], self.ub[d])
                     else:
-                        p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if self.fitter(p.fx, p.fpbest):
-                p.updatePbest()
+                        x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
+
+    def _updateSwarmKernel(self, cauchy1:np.ndarray, cauchy2:np.ndarray) -> None:
+        s = self.swarm
+        sapsomvsUpdate(
+            s.x, s.v, s.pbest, s.pbest[self.gBestIndex].copy(), s.c1, s.c2, s.w,
+            cauchy1, cauchy2, self.vmaxArray, self.lbArray, self.ubArray,
+            float(self.sp), float(self.cp), self.rng.generator
+        )
+        # evaluate fitness and update pbest
+        s.fx[:] = self.fBatch(s.x)
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
     def _updateParameters(self) -> None:
         # calculate weight
-        fvals = [p.fx for p in self.swarm]
+        fvals = self.swarm.fx.tolist()
         fmax = max(fvals)
         weights = [abs(f - fmax) for f in fvals]
         total = sum(weights)
         weights = [ (w / total) for w in weights]
         # average values
-        w = sum([weights[i] * self.swarm[i].w for i in range(self.popSize)])
-        c1 = sum([weights[i] * self.swarm[i].c1 for i in range(self.popSize)])
-        c2 = sum([weights[i] * self.swarm[i].c2 for i in range(self.popSize)])
-        cauchyw = cauchy.rvs(loc = w, scale=self.dtw, size=self.popSize)
-        cauchyc1 = cauchy.rvs(loc=c1, scale=self.dtc1, size=self.popSize)
-        cauchyc2 = cauchy.rvs(loc=c2, scale=self.dtc2, size=self.popSize)
+        w = sum([weights[i] * self.swarm.w[i] for i in range(self.popSize)])
+        c1 = sum([weights[i] * self.swarm.c1[i] for i in range(self.popSize)])
+        c2 = sum([weights[i] * self.swarm.c2[i] for i in range(self.popSize)])
+        cauchyw = self.rng.cauchy(loc = w, scale=self.dtw, size=self.popSize)
+        cauchyc1 = self.rng.cauchy(loc=c1, scale=self.dtc1, size=self.popSize)
+        cauchyc2 = self.rng.cauchy(loc=c2, scale=self.dtc2, size=self.popSize)
         for i in range(self.popSize):
             p = self.swarm[i]
             p.w = cauchyw[i]
             p.c1 = cauchyc1[i]
             p.c2 = cauchyc2[i]
             if p.w > 1.0:
-                p.w = rand(0,1)
+                p.w = self.rng.uniform(0,1)
             elif p.w < 0:
-                p.w = rand(0,0.1)
+                p.w = self.rng.uniform(0,0.1)
             if p.c1 > 4.0:
-                p.c1 = rand(0,4)
+                p.c1 = self.rng.uniform(0,4)
             elif p.c1 < 0:
-                p.c1 = rand(0,1)
+                p.c1 = self.rng.uniform(0,1)
             if p.c2 > 4.0:
-                p.c2 = rand(0,4)
+                p.c2 = self.rng.uniform(0,4)
             elif p.c2 < 0:
-                p.c2 = rand(0,1)
\ No newline at end of file
+                p.c2 = self.rng.uniform(0,1)
\ No newline at end of file
@@ -1,18 +1,29 @@
-from .canonicalPSO import CanonicalPSO, OriginalPSO
-from .bareBonesPSO import BareBonesPSO
-from .AIWPSO import AIWPSO
-from .vonNeumannPSO import VonNeumannPSO
-from .ALCPSO import ALCPSO
-from .DMSPSO import DMSPSO
-from .OLPSO import OLPSO
-from .EPSO import EPSO
-from .ASDPSO import ASDPSO
-from .SAPSOMVS import SAPSOMVS
-from .RVUPSO import RVUPSO
-from .DNSPSO import DNSPSO
-from .APSO import APSO
-from .FDRPSO import FDRPSO
-from .CLPSO import CLPSO
+from importlib import import_module
+from types import ModuleType
+import sys
+
+# module of every algorithm, imported on first access
+_registry:dict[str, str] = {
+    "OriginalPSO": ".canonicalPSO",
+    "CanonicalPSO": ".canonicalPSO",
+    "BareBonesPSO": ".bareBonesPSO",
+    "AIWPSO": ".AIWPSO",
+    "VonNeumannPSO": ".vonNeumannPSO",
+    "ALCPSO": ".ALCPSO",
+    "DMSPSO": ".DMSPSO",
+    "OLPSO": ".OLPSO",
+    "EPSO": ".EPSO",
+    "ASDPSO": ".ASDPSO",
+    "SAPSOMVS": ".SAPSOMVS",
+    "RVUPSO": ".RVUPSO",
+    "DNSPSO": ".DNSPSO",
+    "APSO": ".APSO",
+    "FDRPSO": ".FDRPSO",
+    "CLPSO": ".CLPSO",
+    "AsyncCanonicalPSO": ".asyncPSO",
+    "AsyncVonNeumannPSO": ".asyncPSO",
+    "IslandDMSPSO": ".islandPSO"
+}
 
 __all__ = [
     "OriginalPSO",
@@ -30,5 +41,38 @@ __all__ = [
     "DNSPSO",
     "APSO",
     "FDRPSO",
-    "CLPSO"
-]
\ No newline at end of file
+    "CLPSO",
+    "AsyncCanonicalPSO",
+    "AsyncVonNeumannPSO",
+    "IslandDMSPSO"
+]
+
+def get(name:str) -> type:
+    """
+    the algorithm class called name, its module is imported on first use
+    """
+    if name not in _registry:
+        raise KeyError(f"unknown algorithm {name!r}, expected one of {__all__}")
+    cls = getattr(import_module(_registry[name], __name__), name)
+    globals()[name] = cls
+    return cls
+
+def __getattr__(name:str):
+    if name in _registry:
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+class _Package(ModuleType):
+    """
+    importing a submodule binds it on the package, most algorithms live in
+    a module of the same name, which would then shadow the class
+    """
+    def __setattr__(self, name:str, value) -> None:
+        if isinstance(value, ModuleType) and _registry.get(name) == "." + name:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _Package
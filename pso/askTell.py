@@ -0,0 +1,107 @@
+"""askTell.py ask/tell interface for algorithms written as evaluation generators
+"""
+from .budget import EvaluationBudget
+from .hooks import Snapshot
+import numpy as np
+from typing import Generator, Iterator
+
+# yielded by _evolve at the end of every generation instead of a batch
+generationEnd = object()
+
+class AskTell(EvaluationBudget):
+    """
+    an algorithm using AskTell implements _evolve(), a generator that yields
+    every (k, D) batch of solutions it needs evaluated and receives their
+    (k,) fitness values, and yields generationEnd after every generation,
+    until the run is over
+
+    run() and iterate() evaluate the batches with the algorithm's evaluator,
+    ask()/tell() hand them to the caller instead,
+    the initial swarm is still evaluated when the algorithm is constructed,
+    with an evaluation budget ask() only returns the rows it still allows
+    """
+    _loop:Generator = None
+    _batch:np.ndarray = None
+    _asked:bool = False
+
+    def ask(self) -> np.ndarray:
+        """
+        return the next batch of solutions to evaluate,
+        asking again before tell() returns the same batch
+        """
+        self._skip()
+        if self._batch is None:
+            raise RuntimeError("optimization finished, nothing left to ask")
+        self._asked = True
+        return np.array(self._batch[:self._budgeted(len(self._batch))], dtype=float)
+
+    def tell(self, fitnesses) -> None:
+        """
+        report the fitness values of the last asked batch, in the same order
+        """
+        if not self._asked:
+            raise RuntimeError("tell() called without a pending ask()")
+        fitnesses = np.asarray(fitnesses, dtype=float).reshape(-1)
+        n = self._budgeted(len(self._batch))
+        if len(fitnesses) != n:
+            raise ValueError(f"expected {n} fitness values, got {len(fitnesses)}")
+        self._asked = False
+        self._countEvaluations(n)
+        if n < len(self._batch):
+            fitnesses = np.concatenate([fitnesses, np.full(len(self._batch) - n, self._worst)])
+        self._batch = self._advance(fitnesses)
+
+    def finished(self) -> bool:
+        if self._loop is not None and not self._asked:
+            self._skip()
+        return self._loop is not None and self._batch is None
+
+    def iterate(self) -> Iterator[Snapshot]:
+        """
+        run _evolve, evaluating every batch with fBatch, and yield a
+        snapshot at the end of every generation
+        """
+        if self._asked:
+            raise RuntimeError("cannot iterate with a pending ask()")
+        self._start()
+        while self._batch is not None:
+            if self._batch is generationEnd:
+                yield self.snapshot()
+                self._batch = self._advance(None)
+            else:
+                self._batch = self._advance(self.fBatch(self._batch))
+
+    def atGenerationEnd(self) -> bool:
+        """
+        whether the loop is paused between two generations
+        """
+        return self._batch is generationEnd
+
+    def _advance(self, fitnesses:np.ndarray) -> np.ndarray:
+        try:
+            return self._loop.send(fitnesses)
+        except StopIteration:
+            return None
+
+    def _start(self) -> None:
+        if self._loop is None:
+            self._loop = self._evolve()
+            self._batch = self._advance(None)
+
+    def _skip(self) -> None:
+        """
+        move on to the next batch the caller has to evaluate
+        """
+        self._start()
+        while self._batch is not None:
+            if self._batch is generationEnd:
+                self._batch = self._advance(None)
+            elif self._budgeted(len(self._batch)) == 0:
+                # batches the budget no longer covers are answered without asking
+                self._batch = self._advance(self.fBatch(self._batch))
+            else:
+                break
+
+    def _drive(self) -> None:
+        for _ in self.iterate():
+            pass
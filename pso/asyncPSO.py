@@ -0,0 +1,187 @@
+"""asyncPSO.py steady-state asynchronous PSO
+    Asynchronous Canonical PSO
+    Asynchronous von Neumann PSO
+"""
+from .canonicalPSO import CanonicalPSO, CanonicalParticle
+from .vonNeumannPSO import VonNeumannPSO, ParticleWithNeighbours
+from .common import SwarmState
+from .evaluator import Evaluator
+from .hooks import Snapshot
+from functions.problem import Problem
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from collections import deque
+import numpy as np
+from typing import Iterator
+
+# the steady-state loop has no generation batches to hand out
+_noAskTell = "{} evaluates particles as they are dispatched and has no ask/tell interface, use run() or iterate()"
+
+class _SteadyStatePSO:
+    """
+    no generation barrier: a particle moves and is dispatched again as soon
+    as its previous evaluation returns, pbest and the guide are updated as
+    results arrive, at most maxInFlight evaluations are pending at any time,
+    one generation is counted for every popSize evaluations, the ask/tell
+    interface of the synchronous algorithms is not available,
+    the evaluations are submitted to the evaluator directly rather than
+    through the counted f, they are counted in self.evaluations as their
+    results arrive but their time is not seen by profile()
+    """
+    def run(self) -> tuple[float, list[float]]:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        """
+        yield a snapshot after every popSize evaluations, evaluations still
+        pending when the iteration stops are cancelled
+        """
+        s = self.swarm
+        self._running()
+        budget = self._budgeted((self.G - self.g) * self.popSize)
+        inFlight:dict[Future, int] = {}
+        ready = deque(range(self.popSize))
+        dispatched = 0
+        done = 0
+        try:
+            while done < budget and self.stopReason is None:
+                # keep the evaluator busy
+                while ready and len(inFlight) < self.maxInFlight and dispatched < budget:
+                    i = ready.popleft()
+                    self._moveParticle(i)
+                    inFlight[self.evaluator.submit(self.problem, s.x[i])] = i
+                    dispatched += 1
+                finished, _ = wait(inFlight, return_when=FIRST_COMPLETED)
+                # handle completions in dispatch order, the set order is arbitrary
+                for future in [f for f in inFlight if f in finished]:
+                    i = inFlight.pop(future)
+                    # update pbest and gbest with the result
+                    s.fx[i] = future.result()
+                    self._countEvaluations(1)
+                    if self.fitter(s.fx[i], s.fpbest[i]):
+                        s.pbest[i] = s.x[i]
+                        s.fpbest[i] = s.fx[i]
+                        if self.fitter(s.fpbest[i], s.fpbest[self.gBestIndex]):
+                            self.gBestIndex = i
+                    done += 1
+                    if done % self.popSize == 0:
+                        self._endGeneration()
+                        yield self.snapshot()
+                        if not self._running():
+                            break
+                    ready.append(i)
+            if self.stopReason is None and self.exhausted():
+                # the budget ran out partway through a generation
+                self.stopReason = "maxEvaluations"
+        finally:
+            for future in inFlight:
+                future.cancel()
+
+    def ask(self) -> np.ndarray:
+        raise NotImplementedError(_noAskTell.format(type(self).__name__))
+
+    def tell(self, fitnesses) -> None:
+        raise NotImplementedError(_noAskTell.format(type(self).__name__))
+
+    def finished(self) -> bool:
+        raise NotImplementedError(_noAskTell.format(type(self).__name__))
+
+    def _moveParticle(self, idx:int) -> None:
+        s = self.swarm
+        x, v = s.x[idx], s.v[idx]
+        r1 = self.rng.generator.uniform(0, 1, self.dim)
+        r2 = self.rng.generator.uniform(0, 1, self.dim)
+        # update velocity
+        v[:] = self.w * v + self.c1 * r1 * (s.pbest[idx] - x) + self.c2 * r2 * (self._guide(idx) - x)
+        np.clip(v, -self.vmaxArray, self.vmaxArray, out=v)
+        # update position
+        x += v
+        np.clip(x, self.lbArray, self.ubArray, out=x)
+
+    def _guide(self, idx:int) -> np.ndarray:
+        return self.swarm.pbest[self.gBestIndex]
+
+    def _endGeneration(self) -> None:
+        self.g += 1
+        self._afterGeneration()
+
+class AsyncCanonicalPSO(_SteadyStatePSO, CanonicalPSO):
+    def __init__(
+            self,
+            objectFunction:Problem,
+            populationSize:int = 20,
+            maxGeneration:int = 4000,
+            c1:float = 2.0,
+            c2:float = 2.0,
+            w:float = 0.9,
+            vmaxPercent:float = 0.2,
+            maxInFlight:int = None,
+            initialSwarm:list[CanonicalParticle] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
+        ) -> None:
+        super().__init__(
+            objectFunction,
+            populationSize,
+            maxGeneration,
+            c1,
+            c2,
+            w,
+            vmaxPercent,
+            initialSwarm,
+            evaluator = evaluator,
+            maxEvaluations = maxEvaluations,
+            seed = seed
+        )
+        self.problem = objectFunction
+        self.maxInFlight = maxInFlight if maxInFlight else self.popSize
+
+class AsyncVonNeumannPSO(_SteadyStatePSO, VonNeumannPSO):
+    def __init__(
+            self,
+            objectFunction:Problem,
+            row:int = 5,
+            col:int = 4,
+            maxGeneration:int = 4000,
+            c1:float = 1.49445,
+            c2:float = 1.49445,
+            wmin:float = 0.4,
+            wmax:float = 0.9,
+            vmaxPercent:float = 0.2,
+            maxInFlight:int = None,
+            initialSwarm:list[ParticleWithNeighbours] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
+        ) -> None:
+        super().__init__(
+            objectFunction,
+            row,
+            col,
+            maxGeneration,
+            c1,
+            c2,
+            wmin,
+            wmax,
+            vmaxPercent,
+            initialSwarm,
+            evaluator,
+            maxEvaluations,
+            seed
+        )
+        self.problem = objectFunction
+        self.maxInFlight = maxInFlight if maxInFlight else self.popSize
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
+
+    def _guide(self, idx:int) -> np.ndarray:
+        return self.swarm.pbest[self._getLocalBest(idx)]
+
+    def _endGeneration(self) -> None:
+        self._updateInertiaWeight()
+        self.g += 1
+        self._afterGeneration()
@@ -1,22 +1,30 @@
 """bareBonesPSO.py Bare Bones Particle Swarm 
 """
-from .common import BaseParticle
+from .common import BaseParticle, SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .askTell import AskTell, generationEnd
 from functions.problem import Problem
-from random import gauss as gauss
-from random import uniform as rand
+import numpy as np
 
 class BareBonesParticle(BaseParticle):
     def __init__(self, D:int) -> None:
         super().__init__(D)
 
-class BareBonesPSO:
+class BareBonesPSO(AskTell, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
-            self._updateSwarm()
+        self._drive()
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def _evolve(self):
+        while self._running():
+            yield from self._updateSwarm()
             self._updateGbest()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield generationEnd
 
     def __init__(
             self,
@@ -24,10 +32,15 @@ class BareBonesPSO:
             populationSize:int = 20,
             maxGeneration:int = 4000,
             interactionProbability:float = 0.5,
-            initialSwarm:list[BareBonesParticle] = None
+            initialSwarm:list[BareBonesParticle] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
         
-        self.f = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -39,47 +52,49 @@ class BareBonesPSO:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
     
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = BareBonesParticle(self.dim)
-            for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            self.swarm.x[i] = [self.rng.uniform(self.lb[d], self.ub[d]) for d in range(self.dim)]
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
     
-    def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+    def _updateSwarm(self):
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
+            # the loop works on lists, the row is written back once
+            x, pbest = s.x[i].tolist(), s.pbest[i].tolist()
             for d in range(self.dim):
                 # interaction probability
-                r = rand(0,1)
+                r = self.rng.uniform(0,1)
                 if r < 0.5:
                     # use gauss distribution to update
-                    p.x[d] = gauss(
-                        mu = (p.pbest[d] + gBest.pbest[d]) / 2,
-                        sigma = (abs(p.pbest[d] - gBest.pbest[d])) 
+                    x[d] = self.rng.gauss(
+                        mu = (pbest[d] + gBest[d]) / 2,
+                        sigma = (abs(pbest[d] - gBest[d])) 
                     )
                 else:
                     # learn from previous best
-                    p.x[d] = p.pbest[d]
+                    x[d] = pbest[d]
                 # amend position
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if (self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
\ No newline at end of file
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+        # evaluate fitness and update pbest
+        self.swarm.fx[:] = yield self.swarm.x
+        self.swarm.updatePbest(self.fitter(self.swarm.fx, self.swarm.fpbest))
\ No newline at end of file
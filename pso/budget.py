@@ -0,0 +1,82 @@
+"""budget.py counted objective calls, the evaluation budget and stopping
+"""
+from functions.problem import Problem
+import numpy as np
+
+class EvaluationBudget:
+    """
+    every objective call of an algorithm goes through f/fBatch, which count
+    it in self.evaluations, once maxEvaluations is reached a batch is cut
+    short: the rows beyond the budget are not evaluated and get the worst
+    possible value so they never become a pbest, and the run stops at the
+    end of that generation,
+    the loop of every algorithm asks _running() once per generation, which
+    also checks the criterion given to terminateWhen, the reason the run
+    stopped is left in self.stopReason
+    """
+    evaluations:int = 0
+    maxEvaluations:int = None
+    termination = None
+    stopReason:str = None
+
+    def _bindObjective(self, objectFunction:Problem, maxEvaluations:int = None) -> None:
+        if maxEvaluations is not None and maxEvaluations < 0:
+            raise ValueError(f"maxEvaluations must not be negative, got {maxEvaluations}")
+        self._f = objectFunction.evaluate
+        self._fBatch = self.evaluator.bind(objectFunction)
+        self._worst = np.inf if objectFunction.minimize else -np.inf
+        self.evaluations = 0
+        self.maxEvaluations = maxEvaluations
+
+    @property
+    def fecounter(self) -> int:
+        return self.evaluations
+
+    def f(self, x) -> float:
+        if self._budgeted(1) == 0:
+            return self._worst
+        self.evaluations += 1
+        return self._f(x)
+
+    def fBatch(self, X:np.ndarray) -> np.ndarray:
+        n = self._budgeted(len(X))
+        self.evaluations += n
+        if n == len(X):
+            return self._fBatch(X)
+        F = np.full(len(X), self._worst)
+        if n > 0:
+            F[:n] = self._fBatch(X[:n])
+        return F
+
+    def exhausted(self) -> bool:
+        return self.maxEvaluations is not None and self.evaluations >= self.maxEvaluations
+
+    def _budgeted(self, n:int) -> int:
+        """
+        how many of n evaluations the budget still allows
+        """
+        if self.maxEvaluations is None:
+            return n
+        return max(0, min(n, self.maxEvaluations - self.evaluations))
+
+    def terminateWhen(self, criterion) -> None:
+        """
+        stop the run as soon as criterion (see termination.py) returns True
+        """
+        if criterion is not None:
+            criterion.reset()
+        self.termination = criterion
+
+    def _running(self) -> bool:
+        if self.g >= self.G:
+            self.stopReason = "maxGeneration"
+        elif self.exhausted():
+            self.stopReason = "maxEvaluations"
+        elif self.termination is not None and self.termination(self):
+            self.stopReason = self.termination.fired
+        else:
+            self.stopReason = None
+        return self.stopReason is None
+
+    def _countEvaluations(self, n:int) -> None:
+        self.evaluations += n
@@ -2,23 +2,32 @@
     Canonical PSO
     Original PSO
 """
-from .common import BaseParticle
+from .common import BaseParticle, SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .askTell import AskTell, generationEnd
 from functions.problem import Problem
-from random import uniform as rand
+import numpy as np
 
 class CanonicalParticle(BaseParticle):
     def __init__(self, D:int) -> None:
         super().__init__(D)
         self.v = [0.0 for _ in range(D)]
 
-class CanonicalPSO:
+class CanonicalPSO(AskTell, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
-            self._updateSwarm()
+        self._drive()
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def _evolve(self):
+        while self._running():
+            yield from self._updateSwarm()
             self._updateGbest()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield generationEnd
     
     def __init__(
             self,
@@ -29,10 +38,20 @@ class CanonicalPSO:
             c2:float = 2.0,
             w:float = 0.9,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[CanonicalParticle] = None
+            initialSwarm:list[CanonicalParticle] | SwarmState = None,
+            backend:str = "python",
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
 
-        self.f = objectFunction.evaluate
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"unknown backend: {backend}")
+        self.backend = backend
+
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
         
         self.dim = objectFunction.D
@@ -46,46 +65,75 @@ class CanonicalPSO:
         self.lb = objectFunction.lb
         self.ub = objectFunction.ub        
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
+        self.lbArray = np.array(self.lb, dtype=float)
+        self.ubArray = np.array(self.ub, dtype=float)
+        self.vmaxArray = np.array(self.vmax, dtype=float)
         
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         
         self.gBestIndex:int = 0
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = CanonicalParticle(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
     
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
     
-    def _updateSwarm(self) -> None:
-        gBest = self.swarm[self.gBestIndex]
+    def _updateSwarm(self):
+        if self.backend == "numpy":
+            yield from self._updateSwarmNumpy()
+            return
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex].tolist()
         for i in range(self.popSize):
-            p = self.swarm[i]
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
             for d in range(self.dim):
                 # update velocity
-                p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (gBest.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (gBest[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if(self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        self.swarm.fx[:] = yield self.swarm.x
+        self.swarm.updatePbest(self.fitter(self.swarm.fx, self.swarm.fpbest))
+
+    def _updateSwarmNumpy(self):
+        s = self.swarm
+        gBest = s.pbest[self.gBestIndex]
+        r1 = self.rng.generator.uniform(0, 1, s.x.shape)
+        r2 = self.rng.generator.uniform(0, 1, s.x.shape)
+        # update velocity
+        s.v[:] = self.w * s.v + self.c1 * r1 * (s.pbest - s.x) + self.c2 * r2 * (gBest - s.x)
+        np.clip(s.v, -self.vmaxArray, self.vmaxArray, out=s.v)
+        # update position
+        s.x += s.v
+        np.clip(s.x, self.lbArray, self.ubArray, out=s.x)
+        # evaluate fitness and update pbest
+        s.fx[:] = yield s.x
+        s.updatePbest(self.fitter(s.fx, s.fpbest))
 
 class OriginalPSO(CanonicalPSO):
     def __init__(
@@ -96,7 +144,11 @@ class OriginalPSO(CanonicalPSO):
             c1: float = 2.0, 
             c2: float = 2.0, 
             vmaxPercent: float = 0.2, 
-            initialSwarm: list[CanonicalParticle] = None
+            initialSwarm: list[CanonicalParticle] | SwarmState = None,
+            backend: str = "python",
+            evaluator: Evaluator = None,
+            maxEvaluations: int = None,
+            seed: int | np.random.SeedSequence = None
         ) -> None:
         super().__init__(
             objectFunction, 
@@ -106,5 +158,9 @@ class OriginalPSO(CanonicalPSO):
             c2, 
             1.0, 
             vmaxPercent, 
-            initialSwarm
+            initialSwarm,
+            backend,
+            evaluator,
+            maxEvaluations,
+            seed
         )
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""checkpoint.py save and resume the full state of a run
+"""
+from .common import SwarmState
+from .hooks import GenerationHooks
+from inspect import getgeneratorstate, GEN_SUSPENDED
+import numpy as np
+import json
+import os
+
+checkpointVersion = 2
+
+class Checkpoint(GenerationHooks):
+    """
+    a checkpoint is an uncompressed .npz file holding the swarm arrays,
+    the public attributes of the algorithm (counters, parameters, objects
+    such as the ALCPSO leader, one level deep) and the state of the
+    algorithm's RandomEngine, written atomically at generation boundaries,
+    resume it on an algorithm constructed with the same arguments
+    """
+    # attributes that are bound to the objective or rebuilt by the constructor
+    _checkpointSkip = {"f", "fBatch", "fitter", "evaluate", "evaluateBatch", "evaluator", "swarm", "problem", "stats", "termination", "rng"}
+    _checkpointPath:str = None
+    _checkpointPeriod:int = None
+
+    def checkpointEvery(self, path:str, period:int) -> None:
+        """
+        save a checkpoint to path every period generations during run()
+        """
+        if period < 1:
+            raise ValueError(f"period must be positive, got {period}")
+        self._checkpointPath = path
+        self._checkpointPeriod = period
+        self.addHook(Checkpoint._checkpointTick)
+
+    def saveCheckpoint(self, path:str) -> None:
+        loop = getattr(self, "_loop", None)
+        if loop is not None and getgeneratorstate(loop) == GEN_SUSPENDED and not self.atGenerationEnd():
+            raise RuntimeError("cannot save a checkpoint in the middle of a generation")
+        arrays:dict[str, np.ndarray] = {}
+        meta:dict = {}
+        swarm = getattr(self, "swarm", None)
+        if swarm is not None:
+            for name in swarm.fieldNames:
+                arrays["swarm." + name] = getattr(swarm, name)
+        for name, value in vars(self).items():
+            self._collect(name, value, arrays, meta, nested=True)
+        # random numbers, with the unused part of the pre-generated blocks
+        rng = getattr(self, "rng", None)
+        if rng is not None:
+            meta["rng"], blocks = rng.getState()
+            for name, block in blocks.items():
+                arrays["rng." + name] = block
+        meta["checkpointVersion"] = checkpointVersion
+        meta["algorithm"] = type(self).__name__
+        arrays["meta"] = np.array(json.dumps(meta, default=_toJson))
+
+        # write next to the target and rename, a crash never leaves a partial file
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def resume(self, path:str) -> None:
+        """
+        restore the state saved by saveCheckpoint, run() then carries on
+        from the saved generation
+        """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        meta = json.loads(arrays.pop("meta").item())
+        if meta.get("checkpointVersion") != checkpointVersion:
+            raise ValueError(f"unsupported checkpoint version {meta.get('checkpointVersion')}")
+        if meta.get("algorithm") != type(self).__name__:
+            raise ValueError(f"checkpoint of {meta.get('algorithm')} cannot resume {type(self).__name__}")
+
+        blocks = {key[len("rng."):]: arrays.pop(key) for key in list(arrays) if key.startswith("rng.")}
+        if "rng" in meta:
+            self.rng.setState(meta.pop("rng"), blocks)
+
+        swarm:SwarmState = getattr(self, "swarm", None)
+        for key, value in arrays.items():
+            if key.startswith("swarm."):
+                name = key[len("swarm."):]
+                target = getattr(swarm, name, None) if swarm is not None else None
+                if target is None or target.shape != value.shape:
+                    raise ValueError(f"swarm field {name} does not match the checkpoint")
+                # in place, the swarm may live in shared memory
+                target[...] = value
+            else:
+                self._restore(key, value)
+        for key, value in meta.items():
+            if key not in ("checkpointVersion", "algorithm"):
+                self._restore(key, value)
+        # an ask/tell loop restarts at the saved generation
+        if hasattr(self, "_loop"):
+            self._loop = None
+            self._batch = None
+            self._asked = False
+
+    def _checkpointTick(self) -> None:
+        if self._checkpointPeriod and self.g % self._checkpointPeriod == 0:
+            self.saveCheckpoint(self._checkpointPath)
+
+    def _collect(self, name:str, value, arrays:dict, meta:dict, nested:bool) -> None:
+        if name.startswith("_") or name in self._checkpointSkip or callable(value):
+            return
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif value is None or isinstance(value, (bool, int, float, str, list, tuple, np.generic)):
+            meta[name] = value
+        elif nested and hasattr(value, "__dict__"):
+            for field, fieldValue in vars(value).items():
+                self._collect(name + "." + field, fieldValue, arrays, meta, nested=False)
+
+    def _restore(self, key:str, value) -> None:
+        owner = self
+        *path, name = key.split(".")
+        for part in path:
+            owner = getattr(owner, part)
+        setattr(owner, name, value)
+
+def _toJson(value):
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"cannot store {type(value).__name__} in a checkpoint")
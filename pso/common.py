@@ -1,5 +1,17 @@
 """common.py common constant and data structure
 """
+from .sharedMemory import SharedArray, Descriptor, attach
+import numpy as np
+
+def bestIndexOf(fitter, F:np.ndarray) -> int:
+    """
+    index of the best value of F according to fitter, whichever the direction
+    """
+    lo, hi = int(np.argmin(F)), int(np.argmax(F))
+    return lo if fitter(F[lo], F[hi]) else hi
+
+def bestOf(fitter, F:np.ndarray) -> float:
+    return float(F[bestIndexOf(fitter, F)])
 
 class BaseParticle:
     def __init__(self, D) -> None:
@@ -7,10 +19,167 @@ class BaseParticle:
         self.pbest = [0.0 for _ in range(D)]
         self.fx:float = None
         self.fpbest:float = None
-    
+
     def updatePbest(self):
         """
         set current x as new pbest
         """
         self.pbest = [i for i in self.x]
-        self.fpbest = self.fx
\ No newline at end of file
+        self.fpbest = self.fx
+
+class ParticleView:
+    """
+    particle-like view of one row of a SwarmState,
+    reads and writes go straight to the swarm arrays
+    """
+    def __init__(self, state:"SwarmState", idx:int) -> None:
+        self.__dict__["_state"] = state
+        self.__dict__["_idx"] = idx
+
+    def __getattr__(self, name:str):
+        if name not in self._state.fieldNames:
+            raise AttributeError(name)
+        arr = getattr(self._state, name)
+        if arr.ndim == 1:
+            return arr[self._idx].item()
+        # cache the row view, it stays valid since fields are updated in place
+        row = arr[self._idx]
+        self.__dict__[name] = row
+        return row
+
+    def __setattr__(self, name:str, value) -> None:
+        if name not in self._state.fieldNames:
+            raise AttributeError(name)
+        getattr(self._state, name)[self._idx] = value
+
+    def updatePbest(self) -> None:
+        """
+        set current x as new pbest
+        """
+        self.pbest = self.x
+        self.fpbest = self.fx
+
+class SwarmState:
+    """
+    struct-of-arrays storage of a swarm
+    x, v, pbest are (N, D) float arrays and fx, fpbest are (N,) float arrays,
+    extraFields maps the name of an algorithm specific field to its
+    per-particle (shape, dtype), e.g. {"fi": ((D,), int), "stagnate": ((), int)}
+    with shared=True every field lives in shared memory so that worker
+    processes can attach to it by name, see descriptors() and attach()
+    """
+    def __init__(
+            self,
+            N:int,
+            D:int,
+            extraFields:dict[str, tuple[tuple[int, ...], type]] = None,
+            shared:bool = False
+        ) -> None:
+        self.N = N
+        self.D = D
+        self.shared = shared
+        self.fieldNames:list[str] = []
+        self._sharedArrays:dict[str, SharedArray] = {}
+        self.addField("x", (D,))
+        self.addField("v", (D,))
+        self.addField("pbest", (D,))
+        self.addField("fx")
+        self.addField("fpbest")
+        if extraFields:
+            for name, (shape, dtype) in extraFields.items():
+                self.addField(name, shape, dtype)
+
+    def addField(self, name:str, shape:tuple[int, ...] = (), dtype:type = float) -> None:
+        if name in self.fieldNames:
+            return
+        if self.shared:
+            self._sharedArrays[name] = SharedArray((self.N,) + tuple(shape), dtype)
+            arr = self._sharedArrays[name].array
+            arr.fill(0)
+        else:
+            arr = np.zeros((self.N,) + tuple(shape), dtype=dtype)
+        if shape == () and arr.dtype.kind == "f":
+            # unevaluated fitness
+            arr.fill(np.nan)
+        setattr(self, name, arr)
+        self.fieldNames.append(name)
+
+    def updatePbest(self, mask = slice(None)) -> None:
+        """
+        set current x as new pbest for the particles selected by mask
+        """
+        self.pbest[mask] = self.x[mask]
+        self.fpbest[mask] = self.fx[mask]
+
+    def reorder(self, order) -> None:
+        """
+        permute the particles in place so that particle order[i] becomes particle i
+        """
+        for name in self.fieldNames:
+            arr = getattr(self, name)
+            arr[...] = arr[order]
+
+    def descriptors(self) -> dict[str, Descriptor]:
+        """
+        names of the shared memory blocks behind the fields of a shared swarm
+        """
+        if not self.shared:
+            raise ValueError("swarm is not in shared memory")
+        return {name: shared.descriptor() for name, shared in self._sharedArrays.items()}
+
+    @classmethod
+    def attach(cls, descriptors:dict[str, Descriptor]) -> "SwarmState":
+        """
+        map a shared swarm created by another process, writes to its fields
+        are seen by every process attached to it
+        """
+        state = cls.__new__(cls)
+        state.fieldNames = []
+        state.shared = True
+        state._sharedArrays = {}
+        for name, descriptor in descriptors.items():
+            setattr(state, name, attach(descriptor))
+            state.fieldNames.append(name)
+        state.N, state.D = state.x.shape
+        return state
+
+    def close(self) -> None:
+        """
+        release the shared memory of a shared swarm
+        """
+        for shared in self._sharedArrays.values():
+            shared.close()
+        self._sharedArrays.clear()
+
+    def __len__(self) -> int:
+        return self.N
+
+    def __getitem__(self, idx:int) -> ParticleView:
+        if not -self.N <= idx < self.N:
+            raise IndexError(idx)
+        return ParticleView(self, idx % self.N)
+
+    def __iter__(self):
+        for i in range(self.N):
+            yield ParticleView(self, i)
+
+    @classmethod
+    def fromParticles(
+            cls,
+            particles,
+            extraFields:dict[str, tuple[tuple[int, ...], type]] = None,
+            shared:bool = False
+        ) -> "SwarmState":
+        """
+        build a SwarmState from a list of particle objects (or another SwarmState),
+        fields the particles do not carry keep their default value
+        """
+        particles = list(particles)
+        state = cls(len(particles), len(particles[0].x), extraFields, shared)
+        for name in state.fieldNames:
+            arr = getattr(state, name)
+            for i, p in enumerate(particles):
+                value = getattr(p, name, None)
+                if value is not None:
+                    arr[i] = value
+        return state
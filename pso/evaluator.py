@@ -0,0 +1,218 @@
+"""evaluator.py evaluation back ends for batches of solutions
+"""
+from .sharedMemory import SharedArray, Descriptor, attach
+from functions.problem import Problem
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from functools import partial
+from typing import Callable
+import numpy as np
+
+def _evaluateChunk(problem:Problem, X:np.ndarray) -> np.ndarray:
+    return np.asarray(problem.evaluateBatch(X), dtype=float)
+
+def _evaluateOne(problem:Problem, x:np.ndarray) -> float:
+    return float(problem.evaluate(x))
+
+# problems of this worker process, installed once when the pool starts
+_workerProblems:tuple[Problem, ...] = ()
+
+def _installProblems(problems:tuple[Problem, ...]) -> None:
+    global _workerProblems
+    _workerProblems = problems
+
+def _evaluateChunkIn(token:int, X:np.ndarray) -> np.ndarray:
+    return _evaluateChunk(_workerProblems[token], X)
+
+def _evaluateOneIn(token:int, x:np.ndarray) -> float:
+    return _evaluateOne(_workerProblems[token], x)
+
+def _evaluateShared(
+        token:int,
+        xDescriptor:Descriptor,
+        fDescriptor:Descriptor,
+        xStart:int,
+        fStart:int,
+        n:int
+    ) -> None:
+    X = attach(xDescriptor)
+    F = attach(fDescriptor)
+    F[fStart:fStart + n] = _workerProblems[token].evaluateBatch(X[xStart:xStart + n])
+
+def _evaluateSharedOne(token:int, xDescriptor:Descriptor, row:int) -> float:
+    return float(_workerProblems[token].evaluate(attach(xDescriptor)[row]))
+
+class Evaluator:
+    """
+    evaluate a batch of solutions in the calling process
+    """
+    # algorithms allocate their swarm in shared memory when this is set
+    shared:bool = False
+
+    def evaluate(self, problem:Problem, X:np.ndarray) -> np.ndarray:
+        return _evaluateChunk(problem, X)
+
+    def submit(self, problem:Problem, x:np.ndarray) -> Future:
+        """
+        evaluate a single solution, return a Future of its fitness value
+        """
+        future = Future()
+        try:
+            future.set_result(_evaluateOne(problem, x))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def bind(self, problem:Problem) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        return X -> fitness values of X on problem
+        """
+        return partial(self.evaluate, problem)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Evaluator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class ProcessPoolEvaluator(Evaluator):
+    """
+    fan a batch of solutions out over a pool of worker processes,
+    every task evaluates chunkSize rows with problem.evaluateBatch and
+    the results keep the order of the rows,
+    a problem is pickled once per worker when the pool starts, tasks only
+    carry its token, so changes made to the problem afterwards are not seen
+    by the workers, evaluating a problem the pool has not seen restarts it
+    """
+    def __init__(self, maxWorkers:int = None, chunkSize:int = 1) -> None:
+        if chunkSize < 1:
+            raise ValueError(f"chunkSize must be positive, got {chunkSize}")
+        self.maxWorkers = maxWorkers
+        self.chunkSize = chunkSize
+        self._executor:ProcessPoolExecutor = None
+        # the problems installed in the workers, a problem's token is its index
+        self._problems:list[Problem] = []
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # the pool is started on first use and reused across generations
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.maxWorkers,
+                initializer=_installProblems,
+                initargs=(tuple(self._problems),)
+            )
+        return self._executor
+
+    def bind(self, problem:Problem) -> Callable[[np.ndarray], np.ndarray]:
+        self._token(problem)
+        return super().bind(problem)
+
+    def _token(self, problem:Problem) -> int:
+        """
+        the token of problem in the workers, a new problem restarts the pool
+        """
+        for token, installed in enumerate(self._problems):
+            if installed is problem:
+                return token
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._problems.append(problem)
+        return len(self._problems) - 1
+
+    def evaluate(self, problem:Problem, X:np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0:
+            return np.empty(0)
+        token = self._token(problem)
+        chunks = [X[i:i + self.chunkSize] for i in range(0, len(X), self.chunkSize)]
+        results = self.executor.map(_evaluateChunkIn, [token] * len(chunks), chunks)
+        return np.concatenate(list(results))
+
+    def submit(self, problem:Problem, x:np.ndarray) -> Future:
+        token = self._token(problem)
+        return self.executor.submit(_evaluateOneIn, token, np.array(x, dtype=float))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+class SharedMemoryEvaluator(ProcessPoolEvaluator):
+    """
+    like ProcessPoolEvaluator but no solution or fitness value is pickled:
+    the workers attach to the solutions and to an output buffer in shared
+    memory by name, each task evaluates its rows in place,
+    algorithms using this evaluator keep their swarm in shared memory so
+    evaluating the swarm does not even copy it
+    """
+    shared = True
+
+    def __init__(self, maxWorkers:int = None, chunkSize:int = 1) -> None:
+        super().__init__(maxWorkers, chunkSize)
+        self._input:SharedArray = None
+        self._output:SharedArray = None
+
+    def evaluate(self, problem:Problem, X:np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        n = len(X)
+        if n == 0:
+            return np.empty(0)
+        located = SharedArray.locate(X)
+        if located is None:
+            # not in shared memory yet, one copy into the input buffer
+            self._input = self._reserve(self._input, X.shape)
+            self._input.array[:n] = X
+            located = (self._input.descriptor(), 0)
+        xDescriptor, xStart = located
+        token = self._token(problem)
+        self._output = self._reserve(self._output, (n,))
+        fDescriptor = self._output.descriptor()
+        tasks = [
+            self.executor.submit(
+                _evaluateShared,
+                token,
+                xDescriptor,
+                fDescriptor,
+                xStart + i,
+                i,
+                min(self.chunkSize, n - i)
+            )
+            for i in range(0, n, self.chunkSize)
+        ]
+        wait(tasks)
+        for task in tasks:
+            # raise the first failure
+            task.result()
+        return self._output.array[:n].copy()
+
+    def submit(self, problem:Problem, x:np.ndarray) -> Future:
+        x = np.asarray(x, dtype=float)
+        located = SharedArray.locate(x[None]) if x.ndim == 1 else None
+        if located is None:
+            return super().submit(problem, x)
+        xDescriptor, row = located
+        token = self._token(problem)
+        return self.executor.submit(_evaluateSharedOne, token, xDescriptor, row)
+
+    def close(self) -> None:
+        super().close()
+        for buffer in (self._input, self._output):
+            if buffer is not None:
+                buffer.close()
+        self._input = self._output = None
+
+    @staticmethod
+    def _reserve(buffer:SharedArray, shape:tuple[int, ...]) -> SharedArray:
+        """
+        reuse buffer if it can hold shape rows, else allocate a larger one
+        """
+        if buffer is not None and buffer.shape[1:] == tuple(shape[1:]) and buffer.shape[0] >= shape[0]:
+            return buffer
+        if buffer is not None:
+            shape = (max(shape[0], 2 * buffer.shape[0]),) + tuple(shape[1:])
+            buffer.close()
+        return SharedArray(shape)
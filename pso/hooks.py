@@ -0,0 +1,49 @@
+"""hooks.py callbacks and snapshots at the end of every generation
+"""
+from .common import SwarmState, bestIndexOf
+from typing import Callable
+
+class Snapshot:
+    """
+    state of a run at the end of a generation, swarm is the live swarm, not a copy
+    """
+    __slots__ = ("g", "gbestFitness", "gbestIndex", "evaluations", "swarm")
+
+    def __init__(self, g:int, gbestFitness:float, gbestIndex:int, evaluations:int, swarm:SwarmState) -> None:
+        self.g = g
+        self.gbestFitness = gbestFitness
+        self.gbestIndex = gbestIndex
+        self.evaluations = evaluations
+        self.swarm = swarm
+
+    def __repr__(self) -> str:
+        return f"Snapshot(g={self.g}, gbestFitness={self.gbestFitness}, gbestIndex={self.gbestIndex}, evaluations={self.evaluations})"
+
+class GenerationHooks:
+    """
+    every hook is called with the algorithm once a generation is complete,
+    after the generation counter has been advanced
+    """
+    _hooks:list[Callable] = None
+
+    def addHook(self, hook:Callable) -> None:
+        if self._hooks is None:
+            self._hooks = []
+        if hook not in self._hooks:
+            self._hooks.append(hook)
+
+    def removeHook(self, hook:Callable) -> None:
+        if self._hooks and hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def snapshot(self) -> Snapshot:
+        s = self.swarm
+        idx = getattr(self, "gBestIndex", None)
+        if idx is None:
+            idx = bestIndexOf(self.fitter, s.fpbest)
+        return Snapshot(self.g, s.fpbest[idx].item(), idx, getattr(self, "evaluations", 0), s)
+
+    def _afterGeneration(self) -> None:
+        if self._hooks:
+            for hook in self._hooks:
+                hook(self)
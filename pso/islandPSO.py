@@ -0,0 +1,308 @@
+"""islandPSO.py island model of dynamic multi-swarm PSO
+    Island DMSPSO
+"""
+from .DMSPSO import DMSPSO
+from .rng import RandomEngine
+from .common import SwarmState
+from functions.problem import Problem
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+import numpy as np
+import os
+import traceback
+
+def _runGeneration(alg:DMSPSO) -> None:
+    loop = alg._generation()
+    try:
+        batch = next(loop)
+        while True:
+            batch = loop.send(alg.fBatch(batch))
+    except StopIteration:
+        pass
+
+def _bestFirst(F:np.ndarray, minimize:bool) -> np.ndarray:
+    # stable, so ties keep the particle order
+    return np.argsort(F if minimize else -F, kind="stable")
+
+def _islandWorker(
+        conn:Connection,
+        problem:Problem,
+        settings:dict,
+        seed:np.random.SeedSequence,
+        migrationPeriod:int,
+        migrationSize:int,
+        report:bool
+    ) -> None:
+    """
+    evolve one island, stop at every migration point to send its best pbests
+    (and its whole swarm when report is set) to the coordinator and take the
+    immigrants it sends back, or stop when it sends None
+    """
+    try:
+        alg = DMSPSO(problem, **settings, seed=seed)
+        s = alg.swarm
+        while alg._running():
+            _runGeneration(alg)
+            if alg.g % migrationPeriod != 0 or not alg._running():
+                continue
+            emigrants = _bestFirst(s.fpbest, problem.minimize)[:migrationSize]
+            conn.send((
+                "migrate",
+                s.fpbest[emigrants].copy(),
+                s.pbest[emigrants].copy(),
+                alg.g,
+                alg.evaluations,
+                (s.x.copy(), s.fpbest.copy()) if report else None
+            ))
+            immigrants = conn.recv()
+            if immigrants is None:
+                # a stopping criterion fired in the coordinator
+                alg.stopReason = "stopped"
+                break
+            F, X = immigrants
+            # immigrants replace the worst particles they beat
+            worst = _bestFirst(s.fpbest, problem.minimize)[::-1]
+            k = 0
+            for j in _bestFirst(F, problem.minimize):
+                i = worst[k]
+                if not alg.fitter(F[j], s.fpbest[i]):
+                    break
+                s.x[i] = s.pbest[i] = X[j]
+                s.fx[i] = s.fpbest[i] = F[j]
+                k += 1
+                if k == len(worst):
+                    break
+            alg._updateGbest()
+        conn.send((
+            "done",
+            alg.swarm.fpbest[alg.gBestIndex].item(),
+            alg.swarm.pbest[alg.gBestIndex].copy(),
+            alg.g,
+            alg.evaluations,
+            alg.stopReason
+        ))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+class IslandDMSPSO:
+    """
+    the sub-swarms of DMSPSO are spread over islandNumber worker processes,
+    every island is a DMSPSO of its own and evolves independently,
+    every migrationPeriod generations (a multiple of regroupPeriod, so
+    migration happens at regroup points) each island sends its
+    migrationSize best pbests along the migration topology:
+        "ring"   island i to island i + 1
+        "full"   every island to every other island
+        "random" every island to one randomly chosen island
+    maxEvaluations is shared out over the islands in proportion to their
+    particles and every island stops on its own share, an island that has
+    stopped takes no more migrants, self.evaluations is the sum over the
+    islands, updated at every migration point and when they finish,
+    the criterion given to terminateWhen is checked by the coordinator at
+    every migration point on self.swarm, the x and fpbest of all islands,
+    and stops every island when it fires
+    """
+    topologies = ("ring", "full", "random")
+    evaluations:int = 0
+    termination = None
+    stopReason:str = None
+
+    def run(self) -> tuple[float, list[float]]:
+        conns:list[Connection] = []
+        workers:list[Process] = []
+        # every island gets an independent child stream
+        seeds = self.rng.seedSequence.spawn(self.islandNumber)
+        for settings, seed in zip(self._islandSettings(), seeds):
+            parentConn, childConn = Pipe()
+            worker = Process(
+                target = _islandWorker,
+                args = (
+                    childConn,
+                    self.problem,
+                    settings,
+                    seed,
+                    self.migrationPeriod,
+                    self.migrationSize,
+                    self.termination is not None
+                ),
+                daemon = True
+            )
+            worker.start()
+            childConn.close()
+            conns.append(parentConn)
+            workers.append(worker)
+        try:
+            results = self._coordinate(conns)
+        except BaseException:
+            for worker in workers:
+                worker.terminate()
+            raise
+        finally:
+            for conn, worker in zip(conns, workers):
+                conn.close()
+                worker.join()
+        best = 0
+        for i in range(len(results)):
+            if self.fitter(results[i][0], results[best][0]):
+                best = i
+        return (results[best][0], results[best][1].tolist())
+
+    def __init__(
+            self,
+            objectFunction:Problem,
+            subSwarmSize:int = 3,
+            subSwarmNumber:int = 10,
+            regroupPeriod:int = 5,
+            maxGeneration:int = 2000,
+            c1:float = 1.49445,
+            c2:float = 1.49445,
+            wmin:float = 0.2,
+            wmax:float = 0.9,
+            vmaxPercent:float = 0.2,
+            islandNumber:int = None,
+            migrationPeriod:int = None,
+            migrationSize:int = 1,
+            migrationTopology:str = "ring",
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
+        ) -> None:
+
+        self.rng = RandomEngine(seed)
+        self.problem = objectFunction
+        self.fitter = objectFunction.fitter
+        self.lb = objectFunction.lb
+        self.ub = objectFunction.ub
+
+        self.subSwarmSize = subSwarmSize
+        self.subSwarmNumber = subSwarmNumber
+        self.R = regroupPeriod
+        self.G = maxGeneration
+        self.c1 = c1
+        self.c2 = c2
+        self.wmin = wmin
+        self.wmax = wmax
+        self.vmaxPercent = vmaxPercent
+        if maxEvaluations is not None and maxEvaluations < 0:
+            raise ValueError(f"maxEvaluations must not be negative, got {maxEvaluations}")
+        self.maxEvaluations = maxEvaluations
+        self.evaluations = 0
+        self.g = 0
+
+        self.islandNumber = islandNumber if islandNumber else min(subSwarmNumber, os.cpu_count() or 1)
+        if not 1 <= self.islandNumber <= subSwarmNumber:
+            raise ValueError(f"islandNumber must be between 1 and {subSwarmNumber}, got {self.islandNumber}")
+        self.migrationPeriod = migrationPeriod if migrationPeriod else regroupPeriod
+        if self.migrationPeriod % regroupPeriod != 0:
+            raise ValueError(f"migrationPeriod must be a multiple of regroupPeriod {regroupPeriod}, got {self.migrationPeriod}")
+        if migrationSize < 0:
+            raise ValueError(f"migrationSize must not be negative, got {migrationSize}")
+        self.migrationSize = migrationSize
+        if migrationTopology not in self.topologies:
+            raise ValueError(f"unknown migrationTopology {migrationTopology!r}, expected one of {self.topologies}")
+        self.migrationTopology = migrationTopology
+
+    def _islandSettings(self) -> list[dict]:
+        # share the sub-swarms out as evenly as possible
+        base, extra = divmod(self.subSwarmNumber, self.islandNumber)
+        subSwarms = [base + (1 if i < extra else 0) for i in range(self.islandNumber)]
+        budgets = [None] * self.islandNumber
+        if self.maxEvaluations is not None:
+            # and the budget in proportion to the sub-swarms, the remainder to the first islands
+            budgets = [self.maxEvaluations * n // self.subSwarmNumber for n in subSwarms]
+            for i in range(self.maxEvaluations - sum(budgets)):
+                budgets[i] += 1
+        return [
+            dict(
+                subSwarmSize = self.subSwarmSize,
+                subSwarmNumber = subSwarms[i],
+                regroupPeriod = self.R,
+                maxGeneration = self.G,
+                c1 = self.c1,
+                c2 = self.c2,
+                wmin = self.wmin,
+                wmax = self.wmax,
+                vmaxPercent = self.vmaxPercent,
+                maxEvaluations = budgets[i]
+            )
+            for i in range(self.islandNumber)
+        ]
+
+    def terminateWhen(self, criterion) -> None:
+        """
+        stop all islands at the first migration point criterion (see
+        termination.py) returns True, criteria counting checks such as
+        Stagnation count migration points rather than generations
+        """
+        if criterion is not None:
+            criterion.reset()
+        self.termination = criterion
+
+    def _migrationTargets(self, island:int) -> list[int]:
+        n = self.islandNumber
+        if n == 1:
+            return []
+        if self.migrationTopology == "ring":
+            return [(island + 1) % n]
+        if self.migrationTopology == "full":
+            return [i for i in range(n) if i != island]
+        target = self.rng.randrange(n - 1)
+        return [target if target < island else target + 1]
+
+    def _coordinate(self, conns:list[Connection]) -> list[tuple[float, np.ndarray]]:
+        """
+        route migrants between the islands until all of them are done
+        """
+        dim = self.problem.D
+        results:dict[int, tuple] = {}
+        evaluations = [0] * len(conns)
+        reasons = []
+        # the rows of every island in self.swarm
+        sizes = [settings["subSwarmNumber"] * self.subSwarmSize for settings in self._islandSettings()]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.swarm = SwarmState(int(offsets[-1]), dim)
+        self.stopReason = None
+        active = list(range(len(conns)))
+        while active:
+            messages = {island: self._receive(conns[island]) for island in active}
+            migrants = {}
+            for island, message in messages.items():
+                if message[0] == "done":
+                    _, f, x, g, evaluations[island], reason = message
+                    results[island] = (f, x)
+                    reasons.append(reason)
+                else:
+                    _, F, X, g, evaluations[island], state = message
+                    migrants[island] = (F, X)
+                    if state is not None:
+                        rows = slice(offsets[island], offsets[island + 1])
+                        self.swarm.x[rows], self.swarm.fpbest[rows] = state
+                self.g = max(self.g, g)
+            self.evaluations = sum(evaluations)
+            active = list(migrants)
+            if active and self.stopReason is None and self.termination is not None and self.termination(self):
+                self.stopReason = self.termination.fired
+            if self.stopReason is not None:
+                # stop the islands still running, they answer with done
+                for island in active:
+                    conns[island].send(None)
+                continue
+            inbox = {island: ([], []) for island in active}
+            for island, (F, X) in migrants.items():
+                for target in self._migrationTargets(island):
+                    # an island that has stopped takes no more migrants
+                    if target in inbox:
+                        inbox[target][0].append(F)
+                        inbox[target][1].append(X)
+            for island, (F, X) in inbox.items():
+                conns[island].send((np.concatenate(F) if F else np.empty(0), np.concatenate(X) if X else np.empty((0, dim))))
+        if self.stopReason is None:
+            self.stopReason = "maxGeneration" if "maxGeneration" in reasons else "maxEvaluations"
+        return [results[island] for island in range(len(conns))]
+
+    def _receive(self, conn:Connection) -> tuple:
+        message = conn.recv()
+        if message[0] == "error":
+            raise RuntimeError(f"island worker failed:\n{message[1]}")
+        return message
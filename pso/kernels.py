@@ -0,0 +1,124 @@
+"""kernels.py per-particle update kernels of the irregular algorithms on the
+array-backed swarm, for backend="numba"
+    ASDPSO
+    SAPSOMVS
+    RVUPSO
+
+the kernels are compiled with numba when it is installed and run as plain
+python on the same arrays otherwise, their random numbers come from the
+numpy Generator of the algorithm's RandomEngine, which numba compiled code
+draws from in the same sequence
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# whether the kernels are compiled
+jitAvailable:bool = njit is not None
+
+def _kernel(function):
+    # numpy semantics for a division by zero, as in the python loops
+    return njit(cache=True, error_model="numpy")(function) if jitAvailable else function
+
+@_kernel
+def asdParameters(x, gbest, c1, c2, w, c1max, c2min, c2max, wmin, wmax):
+    N, D = x.shape
+    dis = np.empty(N)
+    for d in range(D):
+        # calculate distances in dimension d
+        dmax = 0
+        for i in range(N):
+            dis[i] = abs(x[i, d] - gbest[d])
+            if dis[i] > dis[dmax]:
+                dmax = i
+        # calculate parameter in dimension d
+        for i in range(N):
+            alpha = 4 * c1max / (dis[dmax] ** 2)
+            if dis[i] > (dis[dmax] / 2):
+                c1[i, d] = c1max
+            else:
+                c1[i, d] = alpha * (dis[i] ** 2)
+            beta = (c2max - c2min) / (((2 / 3) * dis[dmax]) ** 2)
+            if dis[i] > (dis[dmax] / 3):
+                c2[i, d] = c2min + beta * ((dis[dmax] - dis[i]) ** 2)
+            else:
+                c2[i, d] = c2max
+            gamma = (wmax - wmin) / (dis[dmax] ** 2)
+            w[i, d] = wmin + gamma * (dis[i] ** 2)
+
+@_kernel
+def asdUpdate(x, v, pbest, gbest, c1, c2, w, lastx, lastfx, fx, lb, ub, c1max, rng):
+    N, D = x.shape
+    newPosition = np.empty(D)
+    for i in range(N):
+        for d in range(D):
+            # update velocity
+            if c1[i, d] == c1max:
+                r1 = -1.0 + 2.0 * rng.random()
+            else:
+                r1 = rng.random()
+            v[i, d] = w[i, d] * v[i, d] + c1[i, d] * r1 * (pbest[i, d] - x[i, d]) \
+                        + c2[i, d] * rng.random() * (gbest[d] - x[i, d])
+            newPosition[d] = x[i, d] + v[i, d]
+            # shrink the velocity until the position is inside the domain
+            while newPosition[d] < lb[d] or newPosition[d] > ub[d]:
+                v[i, d] = v[i, d] * 0.9 * rng.random()
+                newPosition[d] = x[i, d] + v[i, d]
+        # check whether it is stuck
+        if lastfx[i] != 0.0 and abs(lastfx[i] - fx[i]) <= 1e-10:
+            dis = 0.0
+            for d in range(D):
+                dis += (lastx[i, d] - x[i, d]) ** 2
+            if np.sqrt(dis) <= 1e-5:
+                for d in range(D):
+                    newPosition[d] = lb[d] + (ub[d] - lb[d]) * rng.random()
+        # record the new position
+        for d in range(D):
+            lastx[i, d] = x[i, d]
+            x[i, d] = newPosition[d]
+        lastfx[i] = fx[i]
+
+@_kernel
+def sapsomvsUpdate(x, v, pbest, gbest, c1, c2, w, cauchy1, cauchy2, vmax, lb, ub, sp, cp, rng):
+    N, D = x.shape
+    for i in range(N):
+        if rng.random() > sp:
+            # uniform random number
+            for d in range(D):
+                v[i, d] = w[i] * v[i, d] + c1[i] * rng.random() * (pbest[i, d] - x[i, d]) \
+                            + c2[i] * rng.random() * (gbest[d] - x[i, d])
+        else:
+            # cauchy random number
+            k1 = cauchy1[i]
+            k2 = cauchy1[i + 1]
+            if rng.random() > 0.5:
+                k1 = cauchy2[i]
+                k2 = cauchy2[i + 1]
+            for d in range(D):
+                v[i, d] = w[i] * v[i, d] + c1[i] * k1 * (pbest[i, d] - x[i, d]) \
+                            + c2[i] * k2 * (gbest[d] - x[i, d])
+        for d in range(D):
+            v[i, d] = max(-vmax[d], min(vmax[d], v[i, d]))
+            # update position, re-randomize or clip it outside the domain
+            x[i, d] = x[i, d] + v[i, d]
+            if x[i, d] > ub[d] or x[i, d] < lb[d]:
+                if rng.random() > cp:
+                    x[i, d] = lb[d] + (ub[d] - lb[d]) * rng.random()
+                else:
+                    x[i, d] = max(lb[d], min(ub[d], x[i, d]))
+
+@_kernel
+def rvuUpdate(x, v, pbest, gbest, updateV, w, c1, c2, vmax, lb, ub, rng):
+    N, D = x.shape
+    for i in range(N):
+        for d in range(D):
+            if updateV[i]:
+                # update velocity
+                v[i, d] = w * v[i, d] + c1 * rng.random() * (pbest[i, d] - x[i, d]) \
+                            + c2 * rng.random() * (gbest[d] - x[i, d])
+                v[i, d] = max(-vmax[d], min(vmax[d], v[i, d]))
+            # update position
+            x[i, d] = max(lb[d], min(ub[d], x[i, d] + v[i, d]))
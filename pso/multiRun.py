@@ -0,0 +1,170 @@
+"""multiRun.py many independent runs advanced together
+    Multi-run Canonical PSO
+    Multi-run Bare Bones PSO
+"""
+from .evaluator import Evaluator
+from .budget import EvaluationBudget
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from functions.problem import Problem
+import numpy as np
+from typing import Iterator
+
+class _MultiRunPSO(EvaluationBudget, Checkpoint):
+    """
+    R independent swarms kept in (R, N, D) arrays, every generation
+    evaluates all R * N particles with a single batch call,
+    run() returns one (fbest, xbest) per run,
+    maxEvaluations is the budget of every run, self.evaluations counts the
+    evaluations of all runs, once the budget is short of a whole generation
+    every run gets the same leading particles evaluated
+    """
+    def run(self) -> list[tuple[float, list[float]]]:
+        for _ in self.iterate():
+            pass
+        runs = np.arange(self.runs)
+        fbest = self.fpbest[runs, self.gBestIndex]
+        xbest = self.pbest[runs, self.gBestIndex]
+        return [(float(fbest[r]), xbest[r].tolist()) for r in runs]
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
+            self._updateSwarm()
+            self._evaluate()
+            self._updateGbest()
+            self.g += 1
+            self._afterGeneration()
+            yield self.snapshot()
+
+    def snapshot(self) -> Snapshot:
+        """
+        gbestFitness and gbestIndex hold one entry per run, there is no swarm
+        """
+        runs = np.arange(self.runs)
+        return Snapshot(self.g, self.fpbest[runs, self.gBestIndex], self.gBestIndex, self.evaluations, None)
+
+    def terminateWhen(self, criterion) -> None:
+        raise NotImplementedError(f"{type(self).__name__} advances independent runs together, stopping criteria are not supported")
+
+    def __init__(
+            self,
+            objectFunction:Problem,
+            runs:int,
+            populationSize:int,
+            maxGeneration:int,
+            evaluator:Evaluator,
+            maxEvaluations:int,
+            seed:int | np.random.SeedSequence
+        ) -> None:
+
+        if maxEvaluations is not None and maxEvaluations < 0:
+            raise ValueError(f"maxEvaluations must not be negative, got {maxEvaluations}")
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, None if maxEvaluations is None else maxEvaluations * runs)
+        self.fitter = objectFunction.fitter
+        self.minimize = objectFunction.minimize
+
+        self.dim = objectFunction.D
+        self.runs = runs
+        self.popSize = populationSize
+        self.G = maxGeneration
+        self.g = 0
+
+        self.lb = np.array(objectFunction.lb, dtype=float)
+        self.ub = np.array(objectFunction.ub, dtype=float)
+
+    def _initialSwarm(self) -> None:
+        shape = (self.runs, self.popSize, self.dim)
+        self.x = self.rng.generator.uniform(self.lb, self.ub, shape)
+        self._evaluate()
+        self.pbest = self.x.copy()
+        self.fpbest = self.fx.copy()
+        self.gBestIndex = np.zeros(self.runs, dtype=int)
+        self._updateGbest()
+
+    def _evaluate(self) -> None:
+        # the particles of every run the budget still allows
+        n = self._budgeted(self.runs * self.popSize) // self.runs
+        if n == self.popSize:
+            self.fx = self.fBatch(self.x.reshape(-1, self.dim)).reshape(self.runs, self.popSize)
+            return
+        self.fx = np.full((self.runs, self.popSize), self._worst)
+        if n > 0:
+            self.fx[:, :n] = self.fBatch(self.x[:, :n].reshape(-1, self.dim)).reshape(self.runs, n)
+
+    def _updateGbest(self) -> None:
+        # update pbest, then move gbest of every run to its first best particle
+        improved = self.fitter(self.fx, self.fpbest)
+        self.pbest[improved] = self.x[improved]
+        self.fpbest[improved] = self.fx[improved]
+        runs = np.arange(self.runs)
+        best = np.argmin(self.fpbest, axis=1) if self.minimize else np.argmax(self.fpbest, axis=1)
+        better = self.fitter(self.fpbest[runs, best], self.fpbest[runs, self.gBestIndex])
+        self.gBestIndex = np.where(better, best, self.gBestIndex)
+
+    def _gbest(self) -> np.ndarray:
+        # (R, 1, D) so it broadcasts over the particles of each run
+        return self.pbest[np.arange(self.runs), self.gBestIndex][:, None, :]
+
+class MultiRunCanonicalPSO(_MultiRunPSO):
+    def __init__(
+            self,
+            objectFunction:Problem,
+            runs:int = 30,
+            populationSize:int = 20,
+            maxGeneration:int = 4000,
+            c1:float = 2.0,
+            c2:float = 2.0,
+            w:float = 0.9,
+            vmaxPercent:float = 0.2,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
+        ) -> None:
+        super().__init__(objectFunction, runs, populationSize, maxGeneration, evaluator, maxEvaluations, seed)
+        self.c1 = c1
+        self.c2 = c2
+        self.w = w
+        self.vmax = vmaxPercent * (self.ub - self.lb)
+        self._initialSwarm()
+
+    def _initialSwarm(self) -> None:
+        super()._initialSwarm()
+        self.v = self.rng.generator.uniform(-self.vmax, self.vmax, self.x.shape)
+
+    def _updateSwarm(self) -> None:
+        r1 = self.rng.generator.uniform(0, 1, self.x.shape)
+        r2 = self.rng.generator.uniform(0, 1, self.x.shape)
+        # update velocity
+        self.v = self.w * self.v + self.c1 * r1 * (self.pbest - self.x) \
+                    + self.c2 * r2 * (self._gbest() - self.x)
+        np.clip(self.v, -self.vmax, self.vmax, out=self.v)
+        # update position
+        self.x += self.v
+        np.clip(self.x, self.lb, self.ub, out=self.x)
+
+class MultiRunBareBonesPSO(_MultiRunPSO):
+    def __init__(
+            self,
+            objectFunction:Problem,
+            runs:int = 30,
+            populationSize:int = 20,
+            maxGeneration:int = 4000,
+            interactionProbability:float = 0.5,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
+        ) -> None:
+        super().__init__(objectFunction, runs, populationSize, maxGeneration, evaluator, maxEvaluations, seed)
+        self.ip = interactionProbability
+        self._initialSwarm()
+
+    def _updateSwarm(self) -> None:
+        gbest = self._gbest()
+        # same rule as BareBonesPSO: gauss around the pbest/gbest midpoint or keep pbest
+        useGauss = self.rng.generator.uniform(0, 1, self.x.shape) < 0.5
+        sample = self.rng.generator.normal((self.pbest + gbest) / 2, np.abs(self.pbest - gbest))
+        self.x = np.where(useGauss, sample, self.pbest)
+        np.clip(self.x, self.lb, self.ub, out=self.x)
@@ -0,0 +1,160 @@
+"""profiler.py opt-in wall time of the phases of an algorithm
+"""
+from .askTell import AskTell
+from .budget import EvaluationBudget
+from .checkpoint import Checkpoint
+from .hooks import GenerationHooks
+from functools import wraps
+from inspect import isgenerator
+from time import perf_counter
+
+# infrastructure, not phases of an algorithm
+_mixins = (AskTell, Checkpoint, EvaluationBudget, GenerationHooks, object)
+# attributes holding the objective, and whether they take a batch of rows
+_objectives = {"_f": False, "_fBatch": True, "fBatch": True}
+
+class PhaseStat:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        # objective time spent inside the phase
+        self.objectiveSeconds = 0.0
+
+class PhaseStats:
+    """
+    cumulative wall time and calls of every phase, phase times are inclusive
+    (a phase called by another one is counted in both), generator phases are
+    only timed while they run, not while their batch is being evaluated
+    """
+    def __init__(self) -> None:
+        self.phases:dict[str, PhaseStat] = {}
+        self.runSeconds = 0.0
+        self.objectiveSeconds = 0.0
+        # objective evaluations, one per row of a batch
+        self.objectiveCalls = 0
+
+    def phase(self, name:str) -> PhaseStat:
+        if name not in self.phases:
+            self.phases[name] = PhaseStat()
+        return self.phases[name]
+
+    def asDict(self) -> dict:
+        return {
+            "runSeconds": self.runSeconds,
+            "objectiveSeconds": self.objectiveSeconds,
+            "objectiveCalls": self.objectiveCalls,
+            "phases": {name: vars(stat).copy() for name, stat in self.phases.items()}
+        }
+
+    def report(self) -> str:
+        total = self.runSeconds if self.runSeconds > 0 else 1.0
+        lines = [
+            f"{'phase':24s} {'calls':>8s} {'seconds':>10s} {'%run':>6s} {'objective':>10s}",
+            f"{'run':24s} {'':>8s} {self.runSeconds:10.4f} {100.0:6.1f} {self.objectiveSeconds:10.4f}"
+        ]
+        for name, stat in sorted(self.phases.items(), key=lambda item: -item[1].seconds):
+            if stat.calls == 0:
+                continue
+            lines.append(
+                f"{name:24s} {stat.calls:8d} {stat.seconds:10.4f} "
+                f"{100 * stat.seconds / total:6.1f} {stat.objectiveSeconds:10.4f}"
+            )
+        lines.append(
+            f"objective: {self.objectiveCalls} evaluations {self.objectiveSeconds:.4f}s, "
+            f"bookkeeping: {self.runSeconds - self.objectiveSeconds:.4f}s"
+        )
+        return "\n".join(lines)
+
+def phaseNames(alg) -> list[str]:
+    """
+    the private methods of the algorithm classes of alg
+    """
+    names = []
+    for cls in type(alg).__mro__:
+        if cls in _mixins:
+            continue
+        for name, value in vars(cls).items():
+            if name.startswith("_") and not name.startswith("__") and name != "_evolve" \
+                    and callable(value) and name not in names:
+                names.append(name)
+    return names
+
+def profile(alg, phases:list[str] = None) -> PhaseStats:
+    """
+    instrument alg and return its stats, also available as alg.stats,
+    phases defaults to phaseNames(alg), only this instance is affected
+    """
+    stats = PhaseStats()
+    for name in phases if phases is not None else phaseNames(alg):
+        setattr(alg, name, _timedPhase(getattr(alg, name), stats, stats.phase(name)))
+    for name, batched in _objectives.items():
+        # only the ones bound on the instance, the counted f/fBatch call them
+        if name in vars(alg):
+            setattr(alg, name, _timedObjective(getattr(alg, name), stats, batched))
+    if "run" not in vars(alg):
+        alg.run = _timedRun(alg.run, stats)
+    alg.stats = stats
+    return stats
+
+def unprofile(alg) -> None:
+    """
+    remove the instrumentation added by profile
+    """
+    for name in list(vars(alg)):
+        if hasattr(vars(alg)[name], "__profiled__"):
+            delattr(alg, name)
+    vars(alg).pop("stats", None)
+
+def _timedPhase(method, stats:PhaseStats, stat:PhaseStat):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        stat.calls += 1
+        objective = stats.objectiveSeconds
+        start = perf_counter()
+        try:
+            res = method(*args, **kwargs)
+        finally:
+            stat.seconds += perf_counter() - start
+            stat.objectiveSeconds += stats.objectiveSeconds - objective
+        if isgenerator(res):
+            return _timedGenerator(res, stats, stat)
+        return res
+    wrapper.__profiled__ = True
+    return wrapper
+
+def _timedGenerator(gen, stats:PhaseStats, stat:PhaseStat):
+    received = None
+    while True:
+        objective = stats.objectiveSeconds
+        start = perf_counter()
+        try:
+            batch = gen.send(received)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            stat.seconds += perf_counter() - start
+            stat.objectiveSeconds += stats.objectiveSeconds - objective
+        received = yield batch
+
+def _timedObjective(function, stats:PhaseStats, batched:bool):
+    @wraps(function)
+    def wrapper(X, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(X, *args, **kwargs)
+        finally:
+            stats.objectiveSeconds += perf_counter() - start
+            stats.objectiveCalls += len(X) if batched else 1
+    wrapper.__profiled__ = True
+    return wrapper
+
+def _timedRun(run, stats:PhaseStats):
+    @wraps(run)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return run(*args, **kwargs)
+        finally:
+            stats.runSeconds += perf_counter() - start
+    wrapper.__profiled__ = True
+    return wrapper
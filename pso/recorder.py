@@ -0,0 +1,91 @@
+"""recorder.py stream the trajectory of a run into memory-mapped .npy files
+"""
+from .common import bestOf
+from numpy.lib.format import open_memmap
+import numpy as np
+import os
+
+class TrajectoryRecorder:
+    """
+    record every `every`-th generation of an algorithm into directory:
+        generation.npy (K,)       generation number, -1 for rows not written
+        gbest.npy      (K,)       best pbest fitness
+        fitness.npy    (K, N)     fitness of the particles
+        positions.npy  (K, N, D)  positions of the particles, only if positions
+    the files are preallocated with K = G // every + 1 rows, generation g
+    goes to row g // every, the swarm at attach time (generation 0 of a
+    fresh run) included
+    """
+    def __init__(self, directory:str, every:int = 1, positions:bool = True) -> None:
+        if every < 1:
+            raise ValueError(f"every must be positive, got {every}")
+        self.directory = directory
+        self.every = every
+        self.positions = positions
+        self._files:dict[str, np.memmap] = {}
+
+    def attach(self, alg) -> "TrajectoryRecorder":
+        """
+        allocate the files for alg and record it at the end of every generation
+        """
+        if not hasattr(alg, "swarm"):
+            raise TypeError(f"{type(alg).__name__} has no swarm to record")
+        self.close()
+        N, D = alg.swarm.x.shape
+        K = alg.G // self.every + 1
+        os.makedirs(self.directory, exist_ok=True)
+        self._open("generation", (K,), int).fill(-1)
+        self._open("gbest", (K,), float).fill(np.nan)
+        self._open("fitness", (K, N), float)
+        if self.positions:
+            self._open("positions", (K, N, D), float)
+        self.record(alg)
+        alg.addHook(self.record)
+        return self
+
+    def record(self, alg) -> None:
+        if alg.g % self.every != 0 or not self._files:
+            return
+        row = alg.g // self.every
+        if row >= len(self._files["generation"]):
+            return
+        s = alg.swarm
+        self._files["generation"][row] = alg.g
+        self._files["gbest"][row] = bestOf(alg.fitter, s.fpbest)
+        self._files["fitness"][row] = s.fx
+        if self.positions:
+            self._files["positions"][row] = s.x
+
+    def flush(self) -> None:
+        for arr in self._files.values():
+            arr.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._files.clear()
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def load(directory:str) -> dict[str, np.ndarray]:
+        """
+        read-only memory-mapped views of a recording, up to its last written row
+        """
+        generation = np.load(os.path.join(directory, "generation.npy"), mmap_mode="r")
+        written = np.flatnonzero(generation >= 0)
+        rows = written[-1] + 1 if len(written) else 0
+        res = {}
+        for name in ("generation", "gbest", "fitness", "positions"):
+            path = os.path.join(directory, name + ".npy")
+            if os.path.exists(path):
+                res[name] = np.load(path, mmap_mode="r")[:rows]
+        return res
+
+    def _open(self, name:str, shape:tuple[int, ...], dtype:type) -> np.memmap:
+        path = os.path.join(self.directory, name + ".npy")
+        self._files[name] = open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        return self._files[name]
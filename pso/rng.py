@@ -0,0 +1,114 @@
+"""rng.py random numbers of an optimizer instance
+"""
+from operator import length_hint
+from typing import Iterator, Sequence
+import numpy as np
+
+class RandomEngine:
+    """
+    a numpy Generator owned by one optimizer, seed is an int, a SeedSequence
+    or None for fresh entropy,
+    the scalar draws of the per-dimension loops (uniform, gauss, randrange,
+    cauchy) are served from pre-generated blocks of blockSize variates,
+    whole-swarm updates draw their arrays from self.generator directly,
+    spawn() gives independent child engines for parallel workers
+    """
+    blockSize:int = 4096
+
+    def __init__(self, seed:int | np.random.SeedSequence = None) -> None:
+        if isinstance(seed, np.random.SeedSequence):
+            self.seedSequence = seed
+        else:
+            self.seedSequence = np.random.SeedSequence(seed)
+        self.generator = np.random.Generator(np.random.PCG64(self.seedSequence))
+        # pre-generated blocks as python lists, consumed through iterators
+        self._blocks:dict[str, list[float]] = {name: [] for name in _variates}
+        self._uniforms = iter(self._blocks["uniform"])
+        self._normals = iter(self._blocks["normal"])
+        self._cauchys = iter(self._blocks["cauchy"])
+
+    def spawn(self, n:int) -> list["RandomEngine"]:
+        """
+        n engines on independent child streams
+        """
+        return [RandomEngine(child) for child in self.seedSequence.spawn(n)]
+
+    def uniform(self, low:float = 0.0, high:float = 1.0) -> float:
+        try:
+            r = next(self._uniforms)
+        except StopIteration:
+            self._uniforms = self._refill("uniform")
+            r = next(self._uniforms)
+        return low + (high - low) * r
+
+    def gauss(self, mu:float = 0.0, sigma:float = 1.0) -> float:
+        try:
+            r = next(self._normals)
+        except StopIteration:
+            self._normals = self._refill("normal")
+            r = next(self._normals)
+        return mu + sigma * r
+
+    def randrange(self, start:int, stop:int = None) -> int:
+        """
+        random.randrange(start, stop) without a step
+        """
+        if stop is None:
+            start, stop = 0, start
+        if stop <= start:
+            raise ValueError(f"empty range for randrange({start}, {stop})")
+        return start + int(self.uniform() * (stop - start))
+
+    def cauchy(self, loc:float = 0.0, scale:float = 1.0, size:int = None) -> float | np.ndarray:
+        if size is not None:
+            return loc + scale * self.generator.standard_cauchy(size)
+        try:
+            r = next(self._cauchys)
+        except StopIteration:
+            self._cauchys = self._refill("cauchy")
+            r = next(self._cauchys)
+        return loc + scale * r
+
+    def shuffle(self, x:list) -> None:
+        """
+        shuffle the list x in place
+        """
+        x[:] = [x[i] for i in self.generator.permutation(len(x))]
+
+    def sample(self, population:Sequence, k:int) -> list:
+        """
+        k distinct elements of population
+        """
+        return [population[i] for i in self.generator.choice(len(population), k, replace=False)]
+
+    def getState(self) -> tuple[dict, dict[str, np.ndarray]]:
+        """
+        the generator state and the unused part of the blocks, for checkpoints
+        """
+        state = {"bitGenerator": self.generator.bit_generator.state}
+        blocks = {}
+        for name, it in zip(_variates, (self._uniforms, self._normals, self._cauchys)):
+            block = self._blocks[name]
+            blocks[name] = np.array(block[len(block) - length_hint(it):], dtype=float)
+        return state, blocks
+
+    def setState(self, state:dict, blocks:dict[str, np.ndarray]) -> None:
+        self.generator.bit_generator.state = state["bitGenerator"]
+        for name in _variates:
+            self._blocks[name] = blocks[name].tolist()
+        self._uniforms = iter(self._blocks["uniform"])
+        self._normals = iter(self._blocks["normal"])
+        self._cauchys = iter(self._blocks["cauchy"])
+
+    def _refill(self, name:str) -> Iterator[float]:
+        if name == "uniform":
+            block = self.generator.random(self.blockSize)
+        elif name == "normal":
+            block = self.generator.standard_normal(self.blockSize)
+        else:
+            block = self.generator.standard_cauchy(self.blockSize)
+        self._blocks[name] = block.tolist()
+        return iter(self._blocks[name])
+
+# kinds of pre-generated variates
+_variates = ("uniform", "normal", "cauchy")
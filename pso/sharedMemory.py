@@ -0,0 +1,98 @@
+"""sharedMemory.py numpy arrays in shared memory, attached by name across processes
+"""
+from multiprocessing.shared_memory import SharedMemory
+from collections import OrderedDict
+import numpy as np
+import os
+import weakref
+
+# (shared memory name, array shape, dtype string)
+Descriptor = tuple[str, tuple[int, ...], str]
+
+def _release(shm:SharedMemory, owner:int) -> None:
+    if os.getpid() != owner:
+        # a forked child holds a copy of the owner's object, leave the block alone
+        return
+    try:
+        shm.close()
+    except BufferError:
+        # arrays still point into the block, the mapping goes away with them
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+class SharedArray:
+    """
+    numpy array backed by a block of shared memory owned by this process,
+    the block is unlinked when the SharedArray is closed or collected
+    """
+    _live:"weakref.WeakValueDictionary[str, SharedArray]" = weakref.WeakValueDictionary()
+
+    def __init__(self, shape:tuple[int, ...], dtype:type = float) -> None:
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.shm = SharedMemory(create=True, size=max(size, 1))
+        self.name = self.shm.name
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self._finalizer = weakref.finalize(self, _release, self.shm, os.getpid())
+        SharedArray._live[self.name] = self
+
+    def descriptor(self) -> Descriptor:
+        return (self.name, self.shape, self.dtype.str)
+
+    def close(self) -> None:
+        self.array = None
+        self._finalizer()
+
+    @classmethod
+    def locate(cls, X:np.ndarray) -> tuple[Descriptor, int] | None:
+        """
+        if X is a block of consecutive rows of a live SharedArray return
+        the descriptor of that array and the index of the first row of X
+        """
+        if not isinstance(X, np.ndarray) or X.ndim == 0 or len(X) == 0:
+            return None
+        address = X.__array_interface__["data"][0]
+        for shared in list(cls._live.values()):
+            arr = shared.array
+            if arr is None or arr.ndim != X.ndim or arr.dtype != X.dtype:
+                continue
+            if arr.shape[1:] != X.shape[1:] or arr.strides[1:] != X.strides[1:]:
+                continue
+            if len(X) > 1 and X.strides[0] != arr.strides[0]:
+                continue
+            offset = address - arr.__array_interface__["data"][0]
+            rowBytes = arr.strides[0]
+            if 0 <= offset < arr.nbytes and offset % rowBytes == 0:
+                start = offset // rowBytes
+                if start + len(X) <= len(arr):
+                    return (shared.descriptor(), start)
+        return None
+
+# blocks this process attached to, the oldest are dropped past _maxAttached
+_attached:"OrderedDict[str, SharedMemory]" = OrderedDict()
+_maxAttached = 64
+
+def attach(descriptor:Descriptor) -> np.ndarray:
+    """
+    map the array described by descriptor into this process
+    """
+    name, shape, dtype = descriptor
+    shared = SharedArray._live.get(name)
+    if shared is not None and shared.array is not None:
+        return shared.array
+    shm = _attached.get(name)
+    if shm is None:
+        shm = _attached[name] = SharedMemory(name=name)
+        while len(_attached) > _maxAttached:
+            _, old = _attached.popitem(last=False)
+            try:
+                old.close()
+            except BufferError:
+                pass
+    else:
+        _attached.move_to_end(name)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
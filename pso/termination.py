@@ -0,0 +1,147 @@
+"""termination.py composable stopping criteria, checked once per generation
+    TargetFitness
+    Stagnation
+    Diversity
+    WallClock
+    MaxEvaluations
+    AnyOf / AllOf (also a | b and a & b)
+"""
+from .common import bestOf
+from abc import ABC, abstractmethod
+from time import perf_counter
+import numpy as np
+
+class Criterion(ABC):
+    """
+    called with the algorithm before every generation, returns True to stop,
+    the name of the criterion that fired is kept in self.fired
+    """
+    fired:str = None
+
+    def __call__(self, alg) -> bool:
+        if self.check(alg):
+            self.fired = repr(self)
+            return True
+        return False
+
+    @abstractmethod
+    def check(self, alg) -> bool:
+        """
+        whether the run should stop
+        """
+        pass
+
+    def reset(self) -> None:
+        self.fired = None
+
+    def __or__(self, other:"Criterion") -> "AnyOf":
+        return AnyOf(self, other)
+
+    def __and__(self, other:"Criterion") -> "AllOf":
+        return AllOf(self, other)
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{k}={v!r}" for k, v in vars(self).items() if not k.startswith("_") and k != "fired")
+        return f"{type(self).__name__}({args})"
+
+class TargetFitness(Criterion):
+    """
+    gbest fitness within tolerance of target, or better than it
+    """
+    def __init__(self, target:float, tolerance:float = 0.0) -> None:
+        self.target = target
+        self.tolerance = tolerance
+
+    def check(self, alg) -> bool:
+        best = bestOf(alg.fitter, alg.swarm.fpbest)
+        return abs(best - self.target) <= self.tolerance or alg.fitter(best, self.target)
+
+class Stagnation(Criterion):
+    """
+    gbest fitness not improved by more than tolerance for generations generations
+    """
+    def __init__(self, generations:int, tolerance:float = 0.0) -> None:
+        self.generations = generations
+        self.tolerance = tolerance
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self._best:float = None
+        self._since = 0
+
+    def check(self, alg) -> bool:
+        best = bestOf(alg.fitter, alg.swarm.fpbest)
+        if self._best is None or (alg.fitter(best, self._best) and abs(best - self._best) > self.tolerance):
+            self._best = best
+            self._since = 0
+        else:
+            self._since += 1
+        return self._since >= self.generations
+
+class Diversity(Criterion):
+    """
+    mean distance of the particles to their centroid below epsilon,
+    measured relative to the diagonal of the search space
+    """
+    def __init__(self, epsilon:float) -> None:
+        self.epsilon = epsilon
+
+    def check(self, alg) -> bool:
+        x = alg.swarm.x
+        diagonal = np.linalg.norm(np.asarray(alg.ub, dtype=float) - np.asarray(alg.lb, dtype=float))
+        spread = np.linalg.norm(x - x.mean(axis=0), axis=1).mean()
+        return spread / diagonal < self.epsilon
+
+class WallClock(Criterion):
+    """
+    seconds of wall time since the first check
+    """
+    def __init__(self, seconds:float) -> None:
+        self.seconds = seconds
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self._start:float = None
+
+    def check(self, alg) -> bool:
+        if self._start is None:
+            self._start = perf_counter()
+        return perf_counter() - self._start >= self.seconds
+
+class MaxEvaluations(Criterion):
+    """
+    evaluations used, checked between generations, the maxEvaluations
+    argument of the algorithms stops on the exact evaluation instead
+    """
+    def __init__(self, evaluations:int) -> None:
+        self.evaluations = evaluations
+
+    def check(self, alg) -> bool:
+        return alg.evaluations >= self.evaluations
+
+class AnyOf(Criterion):
+    def __init__(self, *criteria:Criterion) -> None:
+        self.criteria = list(criteria)
+
+    def __call__(self, alg) -> bool:
+        # fired is set by check, the name of the first criterion that fired
+        return self.check(alg)
+
+    def check(self, alg) -> bool:
+        # every criterion is checked so stateful ones keep counting
+        fired = [c for c in self.criteria if c(alg)]
+        self.fired = fired[0].fired if fired else None
+        return bool(fired)
+
+    def reset(self) -> None:
+        super().reset()
+        for c in self.criteria:
+            c.reset()
+
+class AllOf(AnyOf):
+    def check(self, alg) -> bool:
+        fired = [c for c in self.criteria if c(alg)]
+        self.fired = repr(self) if len(fired) == len(self.criteria) else None
+        return self.fired is not None
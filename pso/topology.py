@@ -0,0 +1,98 @@
+"""topology.py neighbourhoods as CSR index arrays
+    ring
+    von Neumann grid
+    clusters (random regrouping)
+    fully connected
+"""
+import numpy as np
+
+class Topology:
+    """
+    the neighbours of particle i are indices[indptr[i]:indptr[i + 1]],
+    in the order they are scanned for the local best
+    """
+    def __init__(self, indptr:np.ndarray, indices:np.ndarray) -> None:
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def neighboursOf(self, idx:int) -> np.ndarray:
+        return self.indices[self.indptr[idx]:self.indptr[idx + 1]]
+
+    def localBestOf(self, idx:int, fitter, F:np.ndarray) -> int:
+        """
+        localBest for a single particle
+        """
+        res = idx
+        for n in self.neighboursOf(idx):
+            if fitter(F[n], F[res]):
+                res = int(n)
+        return res
+
+    def localBest(self, fitter, F:np.ndarray) -> np.ndarray:
+        """
+        (N,) index of the best of every particle and its neighbours by F,
+        the particle itself first and then its neighbours in order, the
+        first of equal values wins as in a scan with the strict fitter
+        """
+        n = len(self)
+        degree = np.diff(self.indptr)
+        # every row with the particle itself prepended
+        starts = self.indptr[:-1] + np.arange(n)
+        candidates = np.empty(n + len(self.indices), dtype=np.int64)
+        isSelf = np.zeros(len(candidates), dtype=bool)
+        isSelf[starts] = True
+        candidates[isSelf] = np.arange(n)
+        candidates[~isSelf] = self.indices
+        values = F[candidates]
+        lo = np.minimum.reduceat(values, starts)
+        hi = np.maximum.reduceat(values, starts)
+        best = np.where(fitter(lo, hi), lo, hi)
+        # first position of the best value in every row
+        rows = np.repeat(np.arange(n), degree + 1)
+        position = np.where(values == best[rows], np.arange(len(values)), len(values))
+        return candidates[np.minimum.reduceat(position, starts)]
+
+def ring(n:int, k:int = 1) -> Topology:
+    """
+    the k particles on each side, i - k, ..., i - 1, i + 1, ..., i + k (mod n)
+    """
+    offsets = np.array([o for o in range(-k, k + 1) if o != 0], dtype=np.int64)
+    indices = (np.arange(n)[:, None] + offsets) % n
+    return Topology(np.arange(n + 1) * len(offsets), indices.reshape(-1))
+
+def vonNeumann(row:int, col:int) -> Topology:
+    """
+    row x col torus, particle r * col + c, neighbours up, down, left, right
+    """
+    r, c = np.divmod(np.arange(row * col), col)
+    indices = np.stack([
+        (r - 1) % row * col + c,
+        (r + 1) % row * col + c,
+        r * col + (c - 1) % col,
+        r * col + (c + 1) % col
+    ], axis=1)
+    return Topology(np.arange(row * col + 1) * 4, indices.reshape(-1))
+
+def clusters(groups:np.ndarray) -> Topology:
+    """
+    every row of the (groups, size) array groups is a cluster, each particle
+    is connected to the others of its row in row order
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    size = groups.shape[1]
+    n = groups.size
+    # the other slots of every slot in a group
+    others = np.array([[j for j in range(size) if j != o] for o in range(size)], dtype=np.int64).reshape(size, size - 1)
+    indices = np.empty((n, size - 1), dtype=np.int64)
+    indices[groups.reshape(-1)] = groups[:, others].reshape(n, size - 1)
+    return Topology(np.arange(n + 1) * (size - 1), indices.reshape(-1))
+
+def fullyConnected(n:int) -> Topology:
+    """
+    every other particle, in index order
+    """
+    indices = np.tile(np.arange(n), (n, 1))[~np.eye(n, dtype=bool)]
+    return Topology(np.arange(n + 1) * (n - 1), indices)
@@ -1,23 +1,37 @@
 """vonNeumannPSO.py von Neumann PSO
 """
 from .canonicalPSO import CanonicalParticle
+from .common import SwarmState
+from .evaluator import Evaluator
+from .rng import RandomEngine
+from .checkpoint import Checkpoint
+from .hooks import Snapshot
+from .budget import EvaluationBudget
+from .topology import vonNeumann
 from functions.problem import Problem
-from random import uniform as rand
+import numpy as np
+from typing import Iterator
 
 class ParticleWithNeighbours(CanonicalParticle):
     def __init__(self, D: int) -> None:
         super().__init__(D)
         self.neighbours:list["ParticleWithNeighbours"] = []
 
-class VonNeumannPSO:
+class VonNeumannPSO(EvaluationBudget, Checkpoint):
     def run(self) -> tuple[float, list[float]]:
-        while self.g < self.G:
+        for _ in self.iterate():
+            pass
+        gbest = self.swarm[self.gBestIndex]
+        return (gbest.fpbest, gbest.pbest.tolist())
+
+    def iterate(self) -> Iterator[Snapshot]:
+        while self._running():
             self._updateSwarm()
             self._updateGbest()
             self._updateInertiaWeight()
             self.g += 1
-        gbest = self.swarm[self.gBestIndex]
-        return (gbest.fpbest, gbest.pbest)
+            self._afterGeneration()
+            yield self.snapshot()
 
     def __init__(
             self,
@@ -30,10 +44,15 @@ class VonNeumannPSO:
             wmin:float = 0.4,
             wmax:float = 0.9,
             vmaxPercent:float = 0.2,
-            initialSwarm:list[ParticleWithNeighbours] = None
+            initialSwarm:list[ParticleWithNeighbours] | SwarmState = None,
+            evaluator:Evaluator = None,
+            maxEvaluations:int = None,
+            seed:int | np.random.SeedSequence = None
         ) -> None:
         
-        self.f = objectFunction.evaluate
+        self.rng = RandomEngine(seed)
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self._bindObjective(objectFunction, maxEvaluations)
         self.fitter = objectFunction.fitter
 
         self.dim = objectFunction.D
@@ -52,8 +71,9 @@ class VonNeumannPSO:
         self.ub = objectFunction.ub
         self.vmax = [vmaxPercent * (self.ub[x] - self.lb[x]) for x in range(self.dim)]
 
-        self.swarm = initialSwarm
-        if not self.swarm:
+        if initialSwarm:
+            self.swarm = SwarmState.fromParticles(initialSwarm, shared=self.evaluator.shared)
+        else:
             self._initialSwarm()
         self._constructNeighbourHood()
 
@@ -61,57 +81,52 @@ class VonNeumannPSO:
         self._updateGbest()
 
     def _initialSwarm(self) -> None:
-        self.swarm = []
-        for _ in range(self.popSize):
-            newParticle = ParticleWithNeighbours(self.dim)
+        self.swarm = SwarmState(self.popSize, self.dim, shared=self.evaluator.shared)
+        for i in range(self.popSize):
+            x = [0.0] * self.dim
+            v = [0.0] * self.dim
             for d in range(self.dim):
-                newParticle.x[d] = rand(self.lb[d], self.ub[d])
-                newParticle.v[d] = rand(-self.vmax[d], self.vmax[d])
-            newParticle.fx = self.f(newParticle.x)
-            newParticle.updatePbest()
-            self.swarm.append(newParticle)
+                x[d] = self.rng.uniform(self.lb[d], self.ub[d])
+                v[d] = self.rng.uniform(-self.vmax[d], self.vmax[d])
+            self.swarm.x[i] = x
+            self.swarm.v[i] = v
+        # evaluate the whole swarm at once
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest()
 
     def _constructNeighbourHood(self) -> None:
-        for r in range(self.row):
-            for c in range(self.col):
-                p = self.swarm[r * self.col + c]
-                up = (r - 1) % self.row * self.col + c
-                down = (r + 1) % self.row * self.col + c
-                left = r * self.col + (c - 1) % self.col
-                right = r * self.col + (c + 1) % self.col
-                for i in [up, down, left, right]:
-                    p.neighbours.append(self.swarm[i])
-
+        self.topology = vonNeumann(self.row, self.col)
 
     def _updateGbest(self) -> None:
+        fpbest = self.swarm.fpbest
         for i in range(self.popSize):
-            if self.fitter(self.swarm[i].fpbest, self.swarm[self.gBestIndex].fpbest):
+            if self.fitter(fpbest[i], fpbest[self.gBestIndex]):
                 self.gBestIndex = i
 
     def _updateSwarm(self) -> None:
+        # pbest does not change before the evaluation, find every lbest at once
+        s = self.swarm
+        lbestIdx = self.topology.localBest(self.fitter, s.fpbest)
         for i in range(self.popSize):
-            p = self.swarm[i]
-            lbest = self._getLocalBest(i)
+            # the loop works on lists, the rows are written back once
+            x, v, pbest = s.x[i].tolist(), s.v[i].tolist(), s.pbest[i].tolist()
+            lbest = s.pbest[lbestIdx[i]].tolist()
             for d in range(self.dim):
                 # update velocity
-                p.v[d] = self.w * p.v[d] + self.c1 * rand(0,1) * (p.pbest[d] - p.x[d]) \
-                            + self.c2 * rand(0,1) * (lbest.pbest[d] - p.x[d])
-                p.v[d] = max(-self.vmax[d], min(self.vmax[d], p.v[d]))
+                v[d] = self.w * v[d] + self.c1 * self.rng.uniform(0,1) * (pbest[d] - x[d]) \
+                            + self.c2 * self.rng.uniform(0,1) * (lbest[d] - x[d])
+                v[d] = max(-self.vmax[d], min(self.vmax[d], v[d]))
                 # update position
-                p.x[d] = p.x[d] + p.v[d]
-                p.x[d] = max(self.lb[d], min(self.ub[d], p.x[d]))
-            # evaluate fitness and update pbest
-            p.fx = self.f(p.x)
-            if(self.fitter(p.fx, p.fpbest)):
-                p.updatePbest()
+                x[d] = x[d] + v[d]
+                x[d] = max(self.lb[d], min(self.ub[d], x[d]))
+            s.x[i] = x
+            s.v[i] = v
+        # evaluate fitness and update pbest
+        self.swarm.fx[:] = self.fBatch(self.swarm.x)
+        self.swarm.updatePbest(self.fitter(self.swarm.fx, self.swarm.fpbest))
     
-    def _getLocalBest(self, idx:int) -> ParticleWithNeighbours:
-        p = self.swarm[idx]
-        res = p
-        for n in p.neighbours:
-            if self.fitter(n.fpbest, res.fpbest):
-                res = n
-        return res
+    def _getLocalBest(self, idx:int) -> int:
+        return self.topology.localBestOf(idx, self.fitter, self.swarm.fpbest)
 
     def _updateInertiaWeight(self) -> None:
         self.w = self.wmax - (self.wmax - self.wmin) * (self.g / self.G)
\ No newline at end of file
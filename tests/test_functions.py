@@ -0,0 +1,73 @@
+"""test_functions.py batched evaluation of the built-in functions against
+their scalar evaluate
+"""
+from math import pi
+import numpy as np
+import pytest
+import functions
+
+# search domain of every function
+domains:dict[str, tuple[float, float]] = {
+    "Sphere": (-100, 100),
+    "SumSquare": (-10, 10),
+    "Schaffer": (-100, 100),
+    "Ackley": (-32.768, 32.768),
+    "Rastrigin": (-5.12, 5.12),
+    "Griewand": (-600, 600),
+    "Rosenbrock": (-5, 10),
+    "Zakharov": (-5, 10),
+    "Easom": (-100, 100),
+    "Step": (-100, 100),
+    "QuarticWithNoise": (-1.28, 1.28)
+}
+# functions defined in two dimensions only
+twoDimensional = ("Schaffer", "Easom")
+dims = (1, 2, 7, 30)
+
+cases = [
+    (name, D)
+    for name in functions.__all__
+    for D in ((2,) if name in twoDimensional else dims)
+]
+
+def makeProblem(name:str, D:int):
+    lo, hi = domains[name]
+    return getattr(functions, name)([lo] * D, [hi] * D)
+
+def randomSolutions(name:str, D:int, n:int = 64) -> np.ndarray:
+    lo, hi = domains[name]
+    X = np.random.default_rng(D).uniform(lo, hi, (n, D))
+    # include the origin and the bounds
+    X[0] = 0.0
+    X[1] = lo
+    X[2] = hi
+    return X
+
+@pytest.mark.parametrize("name, D", [c for c in cases if c[0] != "QuarticWithNoise"])
+def testBatchMatchesScalar(name:str, D:int):
+    problem = makeProblem(name, D)
+    X = randomSolutions(name, D)
+    batch = problem.evaluateBatch(X)
+    scalar = np.array([problem.evaluate(x.tolist()) for x in X])
+    assert batch.shape == (len(X),)
+    np.testing.assert_allclose(batch, scalar, rtol=1e-10, atol=1e-10)
+
+@pytest.mark.parametrize("D", dims)
+def testQuarticNoiseBound(D:int):
+    problem = makeProblem("QuarticWithNoise", D)
+    X = randomSolutions("QuarticWithNoise", D)
+    # the noise free part, the noise is uniform in [0, 1)
+    exact = (X ** 4) @ np.arange(D, dtype=float)
+    batch = problem.evaluateBatch(X)
+    scalar = np.array([problem.evaluate(x.tolist()) for x in X])
+    for values in (batch, scalar):
+        noise = values - exact
+        assert np.all(noise >= -1e-10) and np.all(noise < 1 + 1e-10)
+
+def testGriewandFirstCoordinate():
+    # the first coordinate is divided by sqrt(1), not sqrt(0)
+    problem = makeProblem("Griewand", 1)
+    assert problem.evaluate([pi]) == pytest.approx(pi ** 2 / 4000 + 2)
+    assert problem.evaluateBatch(np.array([[pi]]))[0] == pytest.approx(pi ** 2 / 4000 + 2)
+    problem = makeProblem("Griewand", 5)
+    assert problem.evaluate([0.0] * 5) == pytest.approx(0.0)